@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""Benchmark kaomado.py's hot paths: decompressing, unscrambling, parsing
+palettes, encoding PNGs, and whole rips.
+
+No ROM is needed.  The portraits are random, compressed with compress() and
+checked against decompress(), and packed into fabricated portrait files laid
+out like kaomado.kao and monster.sbin.
+
+Results can be saved as JSON and compared against an earlier run:
+
+    ./benchmark.py --output before.json
+    (change things)
+    ./benchmark.py --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+import kaomado
+import tables
+
+# Sprites start right after the pointer table, and fabricated files are kept
+# no bigger than the real kaomado.kao
+SKY_TABLE_END = 0x2d1e0
+SKY_FILE_END = 0x1968c0
+
+# Headers for Blue's portrait blocks; see MonsterSbin.blocks()
+BLUE_HEADERS = range(0x1a70, 0x1ef0, 0x10)
+BLUE_HEADERS_END = 0x1f00
+
+def fake_palette(rng, stride=3):
+    """Make up a raw palette with the given number of bytes per color."""
+
+    palette = bytearray()
+    for color in range(0x10):
+        palette += bytes(rng.randrange(0x20) << 3 for channel in range(3))
+        palette += b'\x80' * (stride - 3)
+
+    return bytes(palette)
+
+def fake_portrait(rng, stride=3):
+    """Make up a palette and compressed sprite, ready to be put in a portrait
+    file.  The sprite is checked on the way, so that the benchmarks never run
+    on anything compress() got wrong.
+    """
+
+    sprite = fake_sprite(rng)
+    stream = kaomado.compress(sprite)
+    kaomado.check_compressed(sprite, stream)
+
+    return fake_palette(rng, stride) + stream
+
+def fake_sprite(rng):
+    """Make up a raw 40×40 sprite.  The pixels come in runs of a few colors,
+    which is at least a little like a real portrait.
+    """
+
+    pixels = []
+    colors = rng.sample(range(0x10), rng.randint(4, 12))
+
+    while len(pixels) < 1600:
+        pixels.extend([rng.choice(colors)] * rng.randint(1, 12))
+
+    return bytes(low | high << 4 for low, high in zip(pixels[0:1600:2],
+                                                      pixels[1:1600:2]))
+
+def git_commit():
+    """Return the commit being benchmarked, if this is a git checkout."""
+
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode('ASCII').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def make_kaomado(path, count, rng):
+    """Write a fabricated kaomado.kao with the given number of portraits.
+
+    Sprite slots are filled one expression at a time, so that the portraits
+    are spread across as many Pokémon as possible.
+    """
+
+    table = bytearray(SKY_TABLE_END)
+    sprites = bytearray()
+    filled = set()
+
+    for sprite_num in range(40):
+        for internal_id, pokemon in tables.pokemon.sky.items():
+            if len(filled) == count:
+                break
+
+            try:
+                expression, is_right = tables.expressions.sky(pokemon,
+                                                              sprite_num)
+            except KeyError:
+                continue
+
+            if expression is None:
+                continue
+
+            struct.pack_into('<L', table, 0xa0 * internal_id + 4 * sprite_num,
+                             SKY_TABLE_END + len(sprites))
+            sprites += fake_portrait(rng)
+            filled.add((internal_id, sprite_num))
+
+    if len(filled) < count:
+        raise ValueError('only room for {0} portraits'.format(len(filled)))
+    if SKY_TABLE_END + len(sprites) > SKY_FILE_END:
+        raise ValueError("too many portraits to fit in kaomado.kao")
+
+    # Empty slots get junk pointers, like the real thing
+    junk = -(SKY_TABLE_END + len(sprites)) & 0xffffffff
+    for internal_id in tables.pokemon.sky:
+        for sprite_num in range(40):
+            if (internal_id, sprite_num) not in filled:
+                struct.pack_into('<L', table,
+                                 0xa0 * internal_id + 4 * sprite_num, junk)
+
+    with open(path, 'wb') as kaomado_file:
+        kaomado_file.write(table)
+        kaomado_file.write(sprites)
+
+def make_monster_sbin(path, count, rng):
+    """Write a fabricated monster.sbin with the given number of portraits,
+    spread across as many blocks as possible.
+    """
+
+    blue_ids = list(tables.pokemon.blue)[:len(BLUE_HEADERS)]
+    counts = dict.fromkeys(blue_ids, 0)
+
+    # Deal the portraits out to each Pokémon in turn, as far as they go
+    while sum(counts.values()) < count:
+        dealt = False
+
+        for blue_id in blue_ids:
+            if sum(counts.values()) == count:
+                break
+
+            try:
+                expression, is_right = tables.expressions.blue(
+                    tables.pokemon.blue[blue_id], counts[blue_id])
+            except IndexError:
+                continue
+
+            if expression is None:
+                continue
+
+            counts[blue_id] += 1
+            dealt = True
+
+        if not dealt:
+            raise ValueError('only room for {0} portraits'.format(
+                sum(counts.values())))
+
+    data = bytearray(b'ax001'.ljust(BLUE_HEADERS_END, b'\x00'))
+
+    for header, blue_id in zip(BLUE_HEADERS, blue_ids):
+        pointer = len(data)
+
+        block = bytearray(b'SIR0'.ljust(16, b'\x00'))
+        for sprite_num in range(counts[blue_id]):
+            block += fake_portrait(rng, stride=4)
+            block += b'\xaa' * (-len(block) % 4)
+
+        struct.pack_into('<L', block, 4, len(block))
+        data += block
+
+        label = 'kao{0:03}'.format(blue_id).encode('ASCII')
+        data[header:header + 8] = label.ljust(8, b'\x00')
+        struct.pack_into('<2L', data, header + 8, pointer, len(block))
+
+    with open(path, 'wb') as monster_file:
+        monster_file.write(data)
+
+def percentile(times, fraction):
+    """Return the given percentile of a sorted list of times."""
+
+    return times[min(len(times) - 1, int(len(times) * fraction))]
+
+def print_results(results, baseline=None):
+    """Print a table of results, compared against a baseline if given."""
+
+    print('{0:<28} {1:>10} {2:>10} {3:>10} {4:>12}'.format(
+        'benchmark', 'p50 µs', 'p99 µs', 'max µs', 'portraits/s'), end='')
+    print('  vs. baseline' if baseline is not None else '')
+
+    for name, result in results.items():
+        print('{0:<28} {p50_us:>10.1f} {p99_us:>10.1f} {max_us:>10.1f} '
+              '{portraits_per_second:>12.1f}'.format(name, **result), end='')
+
+        if baseline is not None and name in baseline:
+            speedup = (result['portraits_per_second'] /
+                       baseline[name]['portraits_per_second'])
+            print('  {0:.2f}×'.format(speedup))
+        else:
+            print()
+
+def run_benchmarks(work_dir, count=300, repeat=3, jobs=1, seed=0, rips=True):
+    """Fabricate portrait files in the given directory and time everything.
+    Return a dict of results, keyed by benchmark name.
+    """
+
+    rng = random.Random(seed)
+    kaomado_path = os.path.join(work_dir, 'kaomado.kao')
+    monster_path = os.path.join(work_dir, 'monster.sbin')
+
+    make_kaomado(kaomado_path, count, rng)
+    make_monster_sbin(monster_path, min(count, 150), rng)
+
+    results = {}
+
+    with kaomado.open_portrait_file(kaomado_path) as portraits:
+        data = portraits.data
+        offsets = [offset for pokemon_id, sprite_num, offset
+                   in portraits.sprites()]
+        streams = [(data, offset + 0x30) for offset in offsets]
+
+        results['parse_palette'] = summarize(time_each(
+            kaomado.parse_palette, [(data, offset) for offset in offsets],
+            repeat))
+        results['decompress'] = summarize(time_each(
+            kaomado.decompress, streams, repeat))
+
+        decoded = [portraits.decode(offset)[:2] for offset in offsets]
+
+    sprites = [(sprite,) for palette, sprite in decoded]
+    results['pixel_iterator'] = summarize(time_each(
+        lambda sprite: list(kaomado.pixel_iterator(sprite)), sprites, repeat))
+    results['untile'] = summarize(time_each(kaomado.untile, sprites, repeat))
+    results['compress'] = summarize(time_each(kaomado.compress, sprites,
+                                              repeat))
+
+    for backend in kaomado.BACKENDS:
+        results['unscramble[{0}]'.format(backend)] = summarize(time_each(
+            kaomado.unscramble_rows,
+            [(sprite, palette, backend) for palette, sprite in decoded],
+            repeat))
+
+    for mode in kaomado.MODES:
+        for backend in kaomado.BACKENDS:
+            if mode == kaomado.INDEXED and backend != kaomado.PYTHON:
+                # Indexed PNGs don't touch the backend at all
+                continue
+
+            name = 'encode_png[{0},{1}]'.format(mode, backend)
+            results[name] = summarize(time_each(
+                kaomado.encode_png,
+                [(sprite, palette, mode, backend)
+                 for palette, sprite in decoded],
+                repeat))
+
+    if rips:
+        with kaomado.open_portrait_file(monster_path) as portraits:
+            blue_count = len(list(portraits.sprites()))
+
+        results['rip_sky'] = summarize(
+            time_rip(kaomado.rip_sky, kaomado_path, repeat, jobs),
+            len(offsets))
+        results['rip_blue'] = summarize(
+            time_rip(kaomado.rip_blue, monster_path, repeat, jobs),
+            blue_count)
+
+        for output_format in kaomado.OUTPUTS[1:]:
+            name = 'rip_sky[{0}]'.format(output_format)
+            results[name] = summarize(
+                time_rip(kaomado.rip_sky, kaomado_path, repeat, jobs,
+                         output_format=output_format),
+                len(offsets))
+
+    return results
+
+def summarize(times, portraits=None):
+    """Sum up a list of timings in seconds.  Latencies are reported in
+    microseconds per portrait.
+
+    Each timing is one portrait unless a portrait count is given, in which
+    case each timing is a run over that many portraits, and the latencies are
+    averaged over the run.
+    """
+
+    runs = len(times)
+
+    if portraits is not None:
+        times = [run_time / portraits for run_time in times]
+
+    times = sorted(times)
+    total = sum(times)
+
+    return {
+        'runs': runs,
+        'mean_us': total / len(times) * 1e6,
+        'p50_us': percentile(times, 0.5) * 1e6,
+        'p90_us': percentile(times, 0.9) * 1e6,
+        'p99_us': percentile(times, 0.99) * 1e6,
+        'max_us': times[-1] * 1e6,
+        'portraits_per_second': len(times) / total if total else None
+    }
+
+def time_each(function, args_list, repeat=1):
+    """Call function(*args) for each tuple of args, repeat times over.  Return
+    the time each call took.
+    """
+
+    clock = time.perf_counter
+    times = []
+
+    # One untimed call first, so that one-off setup (importing NumPy, say)
+    # doesn't land in the first sample
+    if args_list:
+        function(*args_list[0])
+
+    for run in range(repeat):
+        for args in args_list:
+            start = clock()
+            function(*args)
+            times.append(clock() - start)
+
+    return times
+
+def time_rip(rip, portrait_file, repeat=1, jobs=1,
+             backend=kaomado.DEFAULT_BACKEND, mode=kaomado.TRUECOLOR,
+             output_format=kaomado.DIRECTORY):
+    """Rip a whole portrait file into a temporary directory, or an archive in
+    one, repeat times over.  Return the time each rip took.
+    """
+
+    times = []
+
+    for run in range(repeat):
+        output_dir = tempfile.mkdtemp(prefix='kaomado-benchmark-')
+
+        try:
+            output = os.path.join(output_dir, 'portraits')
+
+            with kaomado.open_portrait_file(portrait_file) as portraits:
+                start = time.perf_counter()
+                with kaomado.open_sink(output, output_format) as sink:
+                    rip(portraits, sink, jobs, backend, mode)
+                times.append(time.perf_counter() - start)
+        finally:
+            shutil.rmtree(output_dir)
+
+    return times
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark kaomado.py against fabricated portrait files.'
+    )
+    parser.add_argument('-n', '--portraits', type=int, default=300,
+                        help='number of portraits to fabricate (default: '
+                             '%(default)s)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='number of times to repeat each benchmark '
+                             '(default: %(default)s)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes for the rips '
+                             '(default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random seed for the fabricated portraits '
+                             '(default: %(default)s)')
+    parser.add_argument('--no-rips', dest='rips', action='store_false',
+                        help='skip the end-to-end rips')
+    parser.add_argument('-o', '--output', metavar='FILE',
+                        help='save the results as JSON')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare against results saved with --output')
+    args = parser.parse_args(argv)
+
+    if args.portraits < 1 or args.repeat < 1 or args.jobs < 1:
+        parser.error('--portraits, --repeat, and --jobs must be positive')
+
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+
+    work_dir = tempfile.mkdtemp(prefix='kaomado-benchmark-')
+    try:
+        results = run_benchmarks(work_dir, args.portraits, args.repeat,
+                                 args.jobs, args.seed, args.rips)
+    finally:
+        shutil.rmtree(work_dir)
+
+    print_results(results, baseline)
+
+    if args.output is not None:
+        report = {
+            'commit': git_commit(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'numpy': (kaomado._numpy()[0].__version__
+                      if kaomado.NUMPY in kaomado.BACKENDS else None),
+            'portraits': args.portraits,
+            'repeat': args.repeat,
+            'jobs': args.jobs,
+            'seed': args.seed,
+            'results': results
+        }
+
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+if __name__ == '__main__':
+    main()
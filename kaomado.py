@@ -2,7 +2,7 @@
 """Extract the portrait sprites from Pokémon Mystery Dungeon: Explorers of Sky.
 PMD: Blue Rescue Team is also partially supported.
 
-Requires pypng 0.0.13 or later.
+Requires pypng 0.0.13 or later.  NumPy is used if it's installed.
 
 This program does not actually rip sprites directly from a ROM.  You'll have to
 provide the portrait file yourself.  In a European PMD: Sky ROM, the file is
@@ -19,19 +19,1712 @@ same file, but if so, they don't use the same compression scheme.
 n.b. "left" and "right" are consistently used from the perspective of the
 Pokémon in the portrait.  This also means that the "right" sprite is the one
 that appears on the right side of the screen in-game.
+
+This can also be imported as a module; iter_portraits() decodes portraits
+without writing anything to disk.  Rips can also go straight into a zip or tar
+file, or a dict in memory, through an OutputSink.
+
+The rebuild command goes the other way, packing a directory of PNGs back into
+a kaomado.kao.
 """
 
-import errno
-import os
-import png
-from struct import unpack
-from sys import argv
+from collections import namedtuple, OrderedDict
+import errno
+from functools import lru_cache, partial
+import hashlib
+from importlib.util import find_spec
+import io
+import json
+import math
+import mmap
+from operator import itemgetter
+import os
+import png
+import posixpath
+import queue
+import shutil
+from struct import pack, pack_into, unpack_from
+import sys
+import threading
+import time
+
+import tables
+
+# Anything else that's slow to import (NumPy, asyncio, multiprocessing,
+# argparse) waits until it's actually needed, so that importing this module or
+# starting a worker process stays quick
+
+SKY = 'sky'
+BLUE = 'blue'
+
+# A decoded portrait: the palette is sixteen five-bit RGB colors, and the pixels
+# are indices into it, row by row
+Portrait = namedtuple('Portrait', 'pokemon expression is_right palette pixels')
+
+# Backends for unscrambling sprites
+PYTHON = 'python'
+NUMPY = 'numpy'
+
+if find_spec('numpy') is not None:
+    BACKENDS = [PYTHON, NUMPY]
+    DEFAULT_BACKEND = NUMPY
+else:
+    BACKENDS = [PYTHON]
+    DEFAULT_BACKEND = PYTHON
+
+# PNG output modes: 5-bit RGB, or 4-bit indices into the sprite's palette
+TRUECOLOR = 'truecolor'
+INDEXED = 'indexed'
+MODES = [TRUECOLOR, INDEXED]
+
+# Ways to group portraits into atlases
+ATLAS_POKEMON = 'pokemon'
+ATLAS_EXPRESSION = 'expression'
+ATLASES = [ATLAS_POKEMON, ATLAS_EXPRESSION]
+
+# Ways to write out duplicate portraits: copy the PNG, link to it, or just
+# list it in aliases.json
+COPY = 'copy'
+HARDLINK = 'hardlink'
+SYMLINK = 'symlink'
+ALIAS = 'alias'
+DUPLICATES = [COPY, HARDLINK, SYMLINK, ALIAS]
+
+# Where ripped PNGs can go: a directory, or a single archive file
+DIRECTORY = 'directory'
+ZIP = 'zip'
+ZIP_STORED = 'zip-stored'
+TAR = 'tar'
+OUTPUTS = [DIRECTORY, ZIP, ZIP_STORED, TAR]
+
+# How many threads write PNGs out while ripping, and how many PNGs can be
+# waiting for them before decoding has to wait too
+DEFAULT_WRITERS = 4
+DEFAULT_QUEUE_DEPTH = 64
+
+# Stages of ripping a portrait, for profiling
+STAGES = ['read', 'decompress', 'unscramble', 'encode', 'write']
+
+# Where incremental rips keep track of what they've ripped
+MANIFEST = 'manifest.json'
+ALIASES = 'aliases.json'
+
+def _pattern_pixels(control, low):
+    """Work out the four pixels that a compressed sprite's pattern control
+    code stands for, given the code's index in the control list and a base
+    pixel.
+    """
+
+    pixels = [low] * 4
+
+    if control == 0:
+        pass
+    elif 1 <= control <= 4:
+        # Lower a particular pixel
+        if control == 1:
+            pixels = [low + 1] * 4
+        pixels[control - 1] -= 1
+    else:
+        # 5 <= control <= 8; raise a particular pixel
+        if control == 5:
+            pixels = [low - 1] * 4
+        pixels[control - 5] += 1
+
+    return pixels
+
+def _pixel_pattern(control, low):
+    """Build the pair of bytes that a compressed sprite's pattern control code
+    stands for, given the code's index in the control list and a base pixel.
+    """
+
+    # Some patterns overflow a nybble.  Real sprites do use a couple of them
+    # (raising pixel 1 or 3 of a base of 15), and those pixels come out as 0,
+    # so every overflowing pixel wraps around the same way.
+    pixels = [pixel & 0xf for pixel in _pattern_pixels(control, low)]
+
+    return (pixels[0] << 4 | pixels[1], pixels[2] << 4 | pixels[3])
+
+# Every pattern for every control code and base pixel, worked out up front
+_pixel_patterns = [
+    [_pixel_pattern(control, low) for low in range(0x10)]
+    for control in range(9)
+]
+
+# And the other way around, for compressing: the base pixel for each pair of
+# bytes that a control code can stand for.  The patterns that overflow a nybble
+# are left out.
+_pattern_lows = [
+    {_pixel_pattern(control, low): low for low in range(0x10)
+     if all(0 <= pixel <= 0xf for pixel in _pattern_pixels(control, low))}
+    for control in range(9)
+]
+
+# Which kind of pattern each pair of bytes is, if any
+_pattern_kinds = {bytes(pattern): control
+                  for control, lows in enumerate(_pattern_lows)
+                  for pattern in lows}
+
+# Back-references reach this far back, at most
+_window_size = 0x1000
+
+class PortraitFile(object):
+    """A memory-mapped portrait file.  Palettes and compressed sprites are
+    sliced straight out of the mapping, so nothing gets copied or read until
+    it's actually decoded.
+
+    Pickling a portrait file only pickles its path; unpickling maps the file
+    again, so worker processes all share the OS's copy of it.
+    """
+
+    version = None
+    palette_stride = 3  # Bytes per palette entry
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, 'rb') as portrait_file:
+            self._mmap = mmap.mmap(portrait_file.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+
+            # Enough to tell if this is the same file as some other time
+            stat = os.fstat(portrait_file.fileno())
+            self.identity = (stat.st_dev, stat.st_ino, stat.st_size,
+                             stat.st_mtime_ns)
+
+        self.data = memoryview(self._mmap)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        return self.path
+
+    def __setstate__(self, path):
+        self.__init__(path)
+
+    def close(self):
+        """Unmap the file."""
+
+        self.data.release()
+        self._mmap.close()
+
+    def decode(self, offset):
+        """Parse the palette and decompress the sprite of the portrait at the
+        given offset.  Return the palette, the raw sprite, and the offset just
+        past the end of the portrait.
+        """
+
+        palette, offset = parse_palette(self.data, offset, self.palette_stride)
+        sprite, offset = decompress(self.data, offset)
+
+        return palette, sprite, offset
+
+    def digest(self, offset):
+        """Hash the raw palette and compressed sprite of the portrait at the
+        given offset, without decoding anything.
+        """
+
+        digest = hashlib.sha1(self.palette(offset))
+        digest.update(self.stream(offset))
+        return digest.hexdigest()
+
+    def file_digest(self):
+        """Hash the whole file, so that something ripped from it can tell
+        whether another file is the very same one.
+        """
+
+        return hashlib.sha1(self.data).hexdigest()
+
+    def layout_digest(self):
+        """Hash where every sprite in the file is, so that something saved
+        for this file can tell if it's been patched since.
+        """
+
+        digest = hashlib.sha1()
+        for sprite in self.sprites():
+            digest.update(pack('<3L', *sprite))
+
+        return digest.hexdigest()
+
+    def palette(self, offset):
+        """Return the raw palette of the portrait at the given offset."""
+
+        return self.data[offset:offset + 0x10 * self.palette_stride]
+
+    def raw(self, offset):
+        """Return the raw palette and compressed sprite of the portrait at the
+        given offset, exactly as they are in the file.
+        """
+
+        return bytes(self.palette(offset)) + bytes(self.stream(offset))
+
+    def stream(self, offset):
+        """Return the compressed sprite of the portrait at the given offset,
+        header and all.
+        """
+
+        offset += 0x10 * self.palette_stride
+
+        # The compressed length counts the header, too
+        length, = unpack_from('<H', self.data, offset + 5)
+        return self.data[offset:offset + length]
+
+class KaomadoFile(PortraitFile):
+    """Explorers of Sky's kaomado.kao.
+
+    The file starts with a table of forty sprite pointers for every internal
+    Pokémon ID, and the sprites follow it.
+    """
+
+    version = SKY
+    table_size = 0x2d1e0
+
+    def describe(self, internal_id, sprite_num):
+        """Return the Pokémon a sprite depicts, its facial expression, and
+        whether it's facing right.
+        """
+
+        pokemon = tables.pokemon.sky[internal_id]
+        expression, is_right = (
+            tables.expressions.sky_table[internal_id][sprite_num])
+
+        return pokemon, expression, is_right
+
+    def is_sprite(self, pointer):
+        """Return whether a sprite pointer actually points to a sprite."""
+
+        # Nonexistent sprites have consistent junk pointers, thankfully; they
+        # point way past the end of the file
+        return self.table_size <= pointer < len(self.data)
+
+    def layout_digest(self):
+        # Every sprite's whereabouts are in the pointer table
+        return hashlib.sha1(self.data[:self.table_size]).hexdigest()
+
+    def pointers(self, internal_id):
+        """Return a Pokémon's sprite pointers, one for each facial expression
+        and direction, even if they're not all used.
+        """
+
+        return unpack_from('<40L', self.data, 0xa0 * internal_id)
+
+    def sprites(self):
+        """Iterate over every sprite worth ripping.  Yield the internal ID
+        of the Pokémon, the sprite number, and the sprite's offset.
+        """
+
+        expression_table = tables.expressions.sky_table
+
+        for internal_id in tables.pokemon.sky:
+            expressions = expression_table[internal_id]
+
+            for sprite_num, pointer in enumerate(self.pointers(internal_id)):
+                if not self.is_sprite(pointer):
+                    continue
+
+                if expressions[sprite_num] is None:
+                    raise KeyError("Sky Pokémon #{0} has a sprite {1}, but "
+                                   "there's no expression for it".format(
+                                       internal_id, sprite_num))
+
+                if expressions[sprite_num][0] is None:
+                    # Some sprites exist, but are junk anyway
+                    continue
+
+                yield internal_id, sprite_num, pointer
+
+class MonsterSbin(PortraitFile):
+    """Blue Rescue Team's monster.sbin.
+
+    In PMD: Blue, each palette entry is padded to four bytes with 0x80 and I
+    don't know why.
+    """
+
+    version = BLUE
+    palette_stride = 4
+
+    def blocks(self):
+        """Iterate over the blocks that each Pokémon's portraits are packed
+        into.  Yield the Blue Pokémon ID, the offset of the first portrait, and
+        the offset where the portraits end.
+        """
+
+        for pokemon_header in range(0x1a70, 0x1ef0, 0x10):
+            # Deliberately skipping the last one because it's a dupe Rayquaza
+
+            # Read the label, figure out which Pokémon it means
+            label = self.data[pokemon_header:pokemon_header + 8]
+            label = bytes(label).rstrip(b'\x00').decode('ASCII')
+            assert label.startswith('kao')
+            blue_id = int(label[3:])
+
+            # We only get one offset where all that Pokémon's portraits are
+            # packed
+            pointer, length = unpack_from('<2L', self.data, pokemon_header + 8)
+
+            # Find the portrait block, figure out where it ends
+            assert self.data[pointer:pointer + 4] == b'SIR0'
+            sprites_length, = unpack_from('<L', self.data, pointer + 4)
+
+            # Skipping eight bytes I don't understand
+            yield blue_id, pointer + 16, pointer + sprites_length
+
+    def describe(self, blue_id, sprite_num):
+        """Return the Pokémon a sprite depicts, its facial expression, and
+        whether it's facing right.
+        """
+
+        pokemon = tables.pokemon.blue[blue_id]
+        expression, is_right = (
+            tables.expressions.blue_table[blue_id][sprite_num])
+
+        return pokemon, expression, is_right
+
+    def sprites(self):
+        """Iterate over every sprite worth ripping.  Yield the Blue Pokémon
+        ID, the sprite number, and the sprite's offset.
+        """
+
+        expression_table = tables.expressions.blue_table
+
+        for blue_id, offset, sprites_end in self.blocks():
+            expressions = expression_table[blue_id]
+
+            sprite_num = 0
+            while offset < sprites_end:
+                expression, is_right = expressions[sprite_num]
+
+                if expression is None:
+                    # Only Skarmory has a placeholder
+                    break
+
+                yield blue_id, sprite_num, offset
+
+                # Skip to the next word-aligned sprite
+                offset += 0x10 * self.palette_stride + len(self.stream(offset))
+                offset += -offset % 4
+                sprite_num += 1
+
+class PortraitIndex(object):
+    """An index of where each portrait is in a portrait file, so that single
+    portraits can be decoded without ripping everything.
+
+    Portraits are looked up by the Pokémon's identifier, whether it's a
+    separate female sprite, the facial expression, and the direction.  Where a
+    Pokémon has more than one sprite for the same expression, the last one
+    wins, as it does when ripping.
+    """
+
+    def __init__(self, kaomado, sprites=None):
+        self.kaomado = kaomado
+
+        if sprites is None:
+            sprites = {}
+
+            for pokemon_id, sprite_num, offset in kaomado.sprites():
+                pokemon, expression, is_right = kaomado.describe(pokemon_id,
+                                                                 sprite_num)
+                key = (pokemon.identifier, pokemon.is_female, expression,
+                       is_right)
+                sprites[key] = (pokemon_id, sprite_num, offset)
+
+        self.sprites = sprites
+
+    @classmethod
+    def load(cls, filename, kaomado):
+        """Load an index saved with save() for the given portrait file.
+        Raise ValueError if it was saved for a different file, including a
+        patched copy of the same one.
+        """
+
+        with open(filename) as index_file:
+            index = json.load(index_file)
+
+        if (index['version'] != kaomado.version or
+                index['size'] != len(kaomado.data) or
+                index.get('layout') != kaomado.layout_digest()):
+            raise ValueError('index is for a different portrait file')
+
+        sprites = {tuple(key): tuple(sprite) for key, sprite
+                   in index['sprites']}
+        return cls(kaomado, sprites)
+
+    def find(self, identifier, expression=None, is_right=False,
+             is_female=False):
+        """Return the Pokémon ID, sprite number, and offset of a portrait, or
+        raise KeyError if there's no such portrait.  The expression defaults
+        to STANDARD.
+        """
+
+        if expression is None:
+            expression = tables.expressions.STANDARD
+
+        return self.sprites[identifier, is_female, expression, is_right]
+
+    def get_portrait(self, identifier, expression=None, is_right=False,
+                     is_female=False):
+        """Decode a single portrait, as found by find().  Return a Portrait,
+        or raise KeyError if there's no such portrait.
+        """
+
+        pokemon_id, sprite_num, offset = self.find(identifier, expression,
+                                                   is_right, is_female)
+        pokemon, expression, is_right = self.kaomado.describe(pokemon_id,
+                                                              sprite_num)
+        palette, sprite, end = self.kaomado.decode(offset)
+
+        return Portrait(pokemon, expression, is_right, palette, untile(sprite))
+
+    def save(self, filename):
+        """Save the index as JSON."""
+
+        index = {
+            'version': self.kaomado.version,
+            'size': len(self.kaomado.data),
+            'layout': self.kaomado.layout_digest(),
+            'sprites': [list(item) for item in self.sprites.items()],
+        }
+
+        with open(filename, 'w') as index_file:
+            json.dump(index, index_file)
+
+class LRUCache(object):
+    """A least-recently-used cache, with limits on both the number of entries
+    and their total size in bytes.  Either limit can be None for no limit.
+
+    Hits, misses, and evictions are counted as it goes.  It's safe to use from
+    more than one thread.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.entries = OrderedDict()  # key: (value, size)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """Return the value for a key, or the default if it's not cached."""
+
+        with self._lock:
+            try:
+                value, size = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size):
+        """Cache a value that takes up the given number of bytes, evicting
+        whatever hasn't been used for longest if there's no room.
+        """
+
+        with self._lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+
+            if self.max_bytes is not None and size > self.max_bytes:
+                # It'd just evict everything, including itself
+                return
+
+            self.entries[key] = (value, size)
+            self.size += size
+
+            while ((self.max_entries is not None and
+                    len(self.entries) > self.max_entries) or
+                   (self.max_bytes is not None and self.size > self.max_bytes)):
+                old_value, old_size = self.entries.popitem(last=False)[1]
+                self.size -= old_size
+                self.evictions += 1
+
+    def stats(self):
+        """Return a dict of counters, for keeping an eye on the cache."""
+
+        with self._lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+class PortraitCache(object):
+    """Recently decoded portraits, for decoding the same portraits over and
+    over without doing all the work every time.  Portraits are identified by
+    the portrait file they came from and their offset.
+
+    Decoded portraits are cached as their palette and untiled pixels.  There
+    can also be a second cache of PNGs, so that a popular portrait only costs
+    a dict lookup.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=None, max_pngs=0,
+                 max_png_bytes=None):
+        self.portraits = LRUCache(max_entries, max_bytes)
+
+        if max_pngs:
+            self.pngs = LRUCache(max_pngs, max_png_bytes)
+        else:
+            self.pngs = None
+
+    def decode(self, kaomado, offset):
+        """Decode the portrait at the given offset in a portrait file.  Return
+        its palette and untiled pixels.
+        """
+
+        key = (kaomado.identity, offset)
+        portrait = self.portraits.get(key)
+
+        if portrait is None:
+            palette, sprite, end = kaomado.decode(offset)
+            portrait = (palette, untile(sprite))
+            self.portraits.put(key, portrait, len(portrait[1]) + 0x30)
+
+        return portrait
+
+    def encode_png(self, kaomado, offset, mode=TRUECOLOR):
+        """Decode the portrait at the given offset in a portrait file and
+        encode it as a PNG.  Return the PNG as bytes.
+        """
+
+        if self.pngs is None:
+            palette, pixels = self.decode(kaomado, offset)
+            return encode_pixels(pixels, palette, mode)
+
+        key = (kaomado.identity, offset, mode)
+        png_data = self.pngs.get(key)
+
+        if png_data is None:
+            palette, pixels = self.decode(kaomado, offset)
+            png_data = encode_pixels(pixels, palette, mode)
+            self.pngs.put(key, png_data, len(png_data))
+
+        return png_data
+
+    def stats(self):
+        """Return a dict of counters for each cache."""
+
+        stats = {'portraits': self.portraits.stats()}
+
+        if self.pngs is not None:
+            stats['pngs'] = self.pngs.stats()
+
+        return stats
+
+class PortraitServer(object):
+    """A small HTTP server for portraits, straight from memory-mapped portrait
+    files.  Portraits are at paths like these:
+
+        /sky/25/standard.png
+        /sky/pikachu/joyous/right.png
+        /sky/female/19/standard.png
+
+    The first part is the game.  Pokémon can be given by identifier or by
+    name, as in tables.pokemon.  Decoding and encoding happen in a thread pool
+    so that the event loop can keep talking to other clients.
+    """
+
+    # Requests with more header lines than this get turned away
+    max_headers = 100
+
+    def __init__(self, kaomados, mode=TRUECOLOR, cache=None, threads=None):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.indexes = {kaomado.version: PortraitIndex(kaomado)
+                        for kaomado in kaomados}
+        self.mode = mode
+
+        if cache is None:
+            cache = PortraitCache(max_pngs=1024)
+
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(threads)
+
+        self.expressions = {
+            value for name, value in vars(tables.expressions).items()
+            if name.isupper() and isinstance(value, str)
+        }
+
+    async def handle(self, reader, writer):
+        """Answer a single request, then hang up."""
+
+        import asyncio
+
+        try:
+            method, status, headers, body = await self.respond(reader)
+
+            response = ['HTTP/1.1 {0}'.format(status)]
+            headers['Content-Length'] = str(len(body))
+            headers['Connection'] = 'close'
+            response.extend('{0}: {1}'.format(*header)
+                            for header in headers.items())
+
+            writer.write('\r\n'.join(response).encode('ASCII') +
+                         b'\r\n\r\n')
+            if method != 'HEAD':
+                writer.write(body)
+
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def find(self, path):
+        """Figure out which portrait a path is asking for.  Return the portrait
+        index to look in and the offset of the portrait, or raise KeyError.
+        """
+
+        parts = path.strip('/').split('/')
+
+        if len(parts) < 3 or not parts[-1].endswith('.png'):
+            raise KeyError(path)
+
+        index = self.indexes[parts.pop(0)]
+        parts[-1] = parts[-1][:-4]
+
+        is_female = parts[0] == 'female'
+        if is_female:
+            parts.pop(0)
+
+        is_right = parts[-1] == 'right' and len(parts) == 3
+        if is_right:
+            parts.pop()
+
+        if len(parts) != 2:
+            raise KeyError(path)
+
+        name, expression = parts
+
+        if expression not in self.expressions:
+            raise KeyError(expression)
+
+        name = name.lower()
+        pokemon = (tables.pokemon.by_identifier.get(name) or
+                   tables.pokemon.by_species[name])
+        pokemon_id, sprite_num, offset = index.find(pokemon.identifier,
+                                                    expression, is_right,
+                                                    is_female)
+
+        return index, offset
+
+    async def respond(self, reader):
+        """Read a request and work out the response.  Return the request
+        method, the status line, a dict of headers, and the body.
+        """
+
+        import asyncio
+
+        # readline() raises ValueError for a line longer than the stream's
+        # limit, 64 KiB by default
+        try:
+            request_line = await reader.readline()
+        except ValueError:
+            return None, '400 Bad Request', {}, b''
+
+        request_headers = {}
+
+        for header_count in range(self.max_headers + 1):
+            try:
+                line = await reader.readline()
+            except ValueError:
+                line = None
+
+            if line in (b'\r\n', b'\n', b''):
+                break
+            elif line is None or header_count == self.max_headers:
+                return None, '431 Request Header Fields Too Large', {}, b''
+
+            # Repeated headers are lists, and can be joined into one
+            name, colon, value = line.decode('latin-1').partition(':')
+            name = name.strip().lower()
+            if name in request_headers:
+                request_headers[name] += ', ' + value.strip()
+            else:
+                request_headers[name] = value.strip()
+
+        try:
+            method, path, http_version = request_line.decode('latin-1').split()
+        except ValueError:
+            return None, '400 Bad Request', {}, b''
+
+        if method not in ('GET', 'HEAD'):
+            return (method, '405 Method Not Allowed', {'Allow': 'GET, HEAD'},
+                    b'')
+
+        try:
+            index, offset = self.find(path.partition('?')[0])
+        except KeyError:
+            return method, '404 Not Found', {}, b''
+
+        try:
+            # The compressed portrait says everything about what the PNG will
+            # be
+            etag = '"{0}-{1}"'.format(index.kaomado.digest(offset), self.mode)
+            headers = {'ETag': etag}
+
+            if _etag_matches(request_headers.get('if-none-match'), etag):
+                return method, '304 Not Modified', headers, b''
+
+            loop = asyncio.get_running_loop()
+            body = await loop.run_in_executor(
+                self.executor, self.cache.encode_png, index.kaomado, offset,
+                self.mode)
+        except Exception as error:
+            # Most likely a corrupt portrait
+            print("Couldn't serve {0}: {1}".format(path, error),
+                  file=sys.stderr)
+            return method, '500 Internal Server Error', {}, b''
+
+        headers['Content-Type'] = 'image/png'
+        return method, '200 OK', headers, body
+
+    async def serve(self, host='127.0.0.1', port=8000):
+        """Serve portraits until cancelled."""
+
+        import asyncio
+
+        server = await asyncio.start_server(self.handle, host, port)
+
+        async with server:
+            await server.serve_forever()
+
+class OutputSink(object):
+    """Somewhere to put ripped PNGs.  PNGs are keyed by filenames relative to
+    the top of the output, with forward slashes, as from portrait_filenames().
+
+    Subclasses need to implement write(), and read() if duplicates are going
+    to be copied.  Sinks that several threads can write to at once set
+    shareable; the rest only ever get one writer at a time.
+    """
+
+    shareable = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def abort(self):
+        """Give up on writing, e.g. because the rip failed."""
+
+        self.close()
+
+    def close(self):
+        """Finish writing."""
+
+    def link(self, source, filename, duplicates=COPY):
+        """Make a PNG a duplicate of another, by copying it or linking to it.
+        By default, it's always a copy.
+        """
+
+        self.write(filename, self.read(source))
+
+    def plan(self, filenames):
+        """Get ready for the given PNGs to be written.  Return the set of
+        them that are already there.
+        """
+
+        return set()
+
+    def read(self, filename):
+        """Return a PNG that's already been written."""
+
+        raise NotImplementedError
+
+    def remove(self, filename):
+        """Remove a PNG left over from an earlier rip, if it's there."""
+
+    def subdirectory(self, name):
+        """Return a sink that writes to a subdirectory of this one."""
+
+        return _SubdirectorySink(self, name)
+
+    def write(self, filename, data):
+        """Write a PNG."""
+
+        raise NotImplementedError
+
+class DirectorySink(OutputSink):
+    """Write each PNG to its own file under an output directory."""
+
+    shareable = True
+
+    def __init__(self, path, created=None):
+        self.path = path
+
+        # PNGs that plan() found weren't there yet
+        self.new = set()
+
+        # Paths of every PNG this sink or its subdirectories have created
+        if created is None:
+            created = set()
+
+        self.created = created
+
+    def abort(self):
+        # Take out what this rip added; anything it overwrote stays as is
+        for path in self.created:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        self.created.clear()
+
+    def link(self, source, filename, duplicates=COPY):
+        link_duplicate(self.path, source, filename, duplicates)
+        self._is_new(filename)
+
+    def plan(self, filenames):
+        filenames = set(filenames)
+        existing = plan_output(self.path, filenames)
+        self.new.update(filenames - existing)
+        return existing
+
+    def read(self, filename):
+        with open(self._path(filename), 'rb') as png_file:
+            return png_file.read()
+
+    def remove(self, filename):
+        try:
+            os.remove(self._path(filename))
+        except FileNotFoundError:
+            pass
+
+    def subdirectory(self, name):
+        return DirectorySink(os.path.join(self.path, name), self.created)
+
+    def write(self, filename, data):
+        path = self._path(filename)
+
+        # A PNG that wasn't there can't be hardlinked from an earlier rip, so
+        # it can be written in place.  Anything else is written under a
+        # temporary name first, so that its other links don't get changed
+        # too, and so that a failed write leaves the old PNG as it was
+        if self._is_new(filename):
+            write_path = path
+        else:
+            write_path = path + '.tmp'
+
+        try:
+            with open(write_path, 'wb') as png_file:
+                png_file.write(data)
+
+            if write_path != path:
+                os.replace(write_path, path)
+        except OSError:
+            # Don't leave half a PNG lying around; either way, this sink
+            # created the file being written
+            try:
+                os.remove(write_path)
+            except OSError:
+                pass
+
+            raise
+
+    def _is_new(self, filename):
+        """Return whether a PNG wasn't there before, the first time it's
+        written, and remember to remove it if the rip is aborted.
+        """
+
+        try:
+            self.new.remove(filename)
+        except KeyError:
+            return False
+
+        self.created.add(self._path(filename))
+        return True
+
+    def _path(self, filename):
+        return os.path.join(self.path, *filename.split('/'))
+
+class MemorySink(OutputSink):
+    """Keep every PNG in a dict, files, by filename."""
+
+    def __init__(self):
+        self.files = {}
+
+    def plan(self, filenames):
+        return {filename for filename in filenames if filename in self.files}
+
+    def read(self, filename):
+        return self.files[filename]
+
+    def remove(self, filename):
+        self.files.pop(filename, None)
+
+    def write(self, filename, data):
+        self.files[filename] = data
+
+class TarSink(OutputSink):
+    """Write every PNG into a single uncompressed tar file, in one sequential
+    pass.  Hardlinked and symlinked duplicates become real links in the tar.
+
+    Rather than keep every PNG in memory in case a duplicate needs to copy
+    it, each PNG's place in the tar file is remembered, and read back from
+    what's been written so far.  The tar file is written under a temporary
+    name and only renamed once it's complete.
+    """
+
+    def __init__(self, path):
+        import tarfile
+
+        self.path = path
+        self.tar_file = tarfile.open(path + '.tmp', 'w',
+                                     format=tarfile.PAX_FORMAT)
+        self.mtime = time.time()
+
+        # Where each PNG's data starts in the tar file, and how long it is
+        self.members = {}
+
+    def abort(self):
+        self.tar_file.close()
+        os.remove(self.path + '.tmp')
+
+    def close(self):
+        self.tar_file.close()
+        os.replace(self.path + '.tmp', self.path)
+
+    def link(self, source, filename, duplicates=COPY):
+        import tarfile
+
+        if duplicates == HARDLINK:
+            info = self._info(filename, tarfile.LNKTYPE)
+            info.linkname = source
+        elif duplicates == SYMLINK:
+            info = self._info(filename, tarfile.SYMTYPE)
+            info.linkname = posixpath.relpath(source,
+                                              posixpath.dirname(filename))
+        else:
+            self.write(filename, self.read(source))
+            return
+
+        self.tar_file.addfile(info)
+
+    def read(self, filename):
+        offset, size = self.members[filename]
+        self.tar_file.fileobj.flush()
+
+        with open(self.path + '.tmp', 'rb') as tar_file:
+            tar_file.seek(offset)
+            return tar_file.read(size)
+
+    def write(self, filename, data):
+        import tarfile
+
+        info = self._info(filename, tarfile.REGTYPE)
+        info.size = len(data)
+        self.tar_file.addfile(info, io.BytesIO(data))
+
+        # The data comes last, padded out to a whole block
+        padded_size = -(-len(data) // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        self.members[filename] = (self.tar_file.offset - padded_size,
+                                  len(data))
+
+    def _info(self, filename, type):
+        import tarfile
+
+        info = tarfile.TarInfo(filename)
+        info.type = type
+        info.mode = 0o644
+        info.mtime = self.mtime
+        return info
+
+class ZipSink(OutputSink):
+    """Write every PNG into a single zip file, in one sequential pass.
+
+    PNGs are already compressed, so storing them instead of deflating them
+    again makes for a much quicker rip and a slightly bigger zip.
+    Symlinked duplicates become symlinks, as Info-ZIP stores them; other
+    duplicates are copies.  The zip file is written under a temporary name
+    and only renamed once it's complete.
+    """
+
+    def __init__(self, path, deflate=True):
+        import zipfile
+
+        if deflate:
+            compression = zipfile.ZIP_DEFLATED
+        else:
+            compression = zipfile.ZIP_STORED
+
+        self.path = path
+        self.zip_file = zipfile.ZipFile(path + '.tmp', 'w', compression)
+        self.date_time = time.localtime()[:6]
+
+    def abort(self):
+        self.zip_file.close()
+        os.remove(self.path + '.tmp')
+
+    def close(self):
+        self.zip_file.close()
+        os.replace(self.path + '.tmp', self.path)
+
+    def link(self, source, filename, duplicates=COPY):
+        if duplicates == SYMLINK:
+            target = posixpath.relpath(source, posixpath.dirname(filename))
+            self._write(filename, target.encode('UTF-8'), 0o120777)
+        else:
+            self.write(filename, self.read(source))
+
+    def read(self, filename):
+        return self.zip_file.read(filename)
+
+    def write(self, filename, data):
+        self._write(filename, data, 0o100644)
+
+    def _write(self, filename, data, mode):
+        import zipfile
+
+        info = zipfile.ZipInfo(filename, self.date_time)
+        info.compress_type = self.zip_file.compression
+        info.external_attr = mode << 16
+        self.zip_file.writestr(info, data)
+
+class WriteBehind(object):
+    """Writes PNGs to an output sink from a pool of background threads, so
+    that decoding carries on while earlier PNGs are still being written.
+
+    At most queue_depth PNGs wait to be written at once; past that, write()
+    blocks until the writers catch up.  If any write fails, everything still
+    queued is thrown away, and the error is raised from the next write() or
+    from close().  Sinks that aren't shareable only get one writer, so they
+    see PNGs in the order they were queued.
+    """
+
+    def __init__(self, sink, writers=DEFAULT_WRITERS,
+                 queue_depth=DEFAULT_QUEUE_DEPTH, profile=None):
+        if not sink.shareable:
+            writers = 1
+
+        self.sink = sink
+        self.queue = queue.Queue(queue_depth)
+        self.profile = profile
+        self.error = None
+        self.aborted = False
+
+        # Profiles aren't thread-safe, so writers just keep a list of how long
+        # each write took
+        self.write_times = []
+
+        self.threads = [threading.Thread(target=self._write_queued,
+                                         daemon=True)
+                        for writer in range(writers)]
+        for thread in self.threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def abort(self):
+        """Throw away everything still queued, and stop the writers."""
+
+        self.aborted = True
+        self._stop()
+
+    def close(self):
+        """Wait for everything queued to be written, and stop the writers.
+        Raise an OSError if any write failed.
+        """
+
+        self._stop()
+        self._check()
+
+        if self.profile is not None:
+            for filename, seconds in self.write_times:
+                self.profile.add('write', seconds, filename)
+
+    def write(self, filename, data):
+        """Queue a PNG to be written."""
+
+        self._check()
+        self.queue.put((filename, data))
+
+    def _check(self):
+        """Raise an OSError if a write has failed."""
+
+        if self.error is not None:
+            filename, error = self.error
+            raise OSError("Couldn't write {0}: {1}".format(filename, error)) \
+                from error
+
+    def _stop(self):
+        """Tell every writer to stop once the queue is empty, and wait."""
+
+        for thread in self.threads:
+            self.queue.put(None)
+
+        for thread in self.threads:
+            thread.join()
+
+    def _write_queued(self):
+        """Write PNGs from the queue until told to stop."""
+
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+
+            if self.error is not None or self.aborted:
+                # Keep emptying the queue, so nothing waits on it forever
+                continue
+
+            filename, data = item
+            start = time.perf_counter()
+
+            try:
+                self.sink.write(filename, data)
+            except Exception as error:
+                if self.error is None:
+                    self.error = (filename, error)
+
+                continue
+
+            self.write_times.append((filename, time.perf_counter() - start))
+
+class _SubdirectorySink(OutputSink):
+    """Writes to a subdirectory of another sink, which stays in charge of
+    closing everything.
+    """
+
+    def __init__(self, parent, name):
+        self.parent = parent
+        self.prefix = name + '/'
+
+    def abort(self):
+        pass
+
+    def close(self):
+        pass
+
+    def link(self, source, filename, duplicates=COPY):
+        self.parent.link(self.prefix + source, self.prefix + filename,
+                         duplicates)
+
+    def plan(self, filenames):
+        existing = self.parent.plan(self.prefix + filename
+                                    for filename in filenames)
+        return {filename[len(self.prefix):] for filename in existing
+                if filename.startswith(self.prefix)}
+
+    def read(self, filename):
+        return self.parent.read(self.prefix + filename)
+
+    def remove(self, filename):
+        self.parent.remove(self.prefix + filename)
+
+    def write(self, filename, data):
+        self.parent.write(self.prefix + filename, data)
+
+class Profile(object):
+    """How long each stage of a rip takes, in total and for each group of
+    portraits.  Times are first grouped by PNG, then regrouped by Pokémon.
+
+    Profiles from worker processes can be merged into one.  Ripping without a
+    profile skips the timing altogether.
+    """
+
+    def __init__(self):
+        self.stages = OrderedDict((stage, [0, 0.0]) for stage in STAGES)
+        self.groups = {}
+
+    def add(self, stage, seconds, group=None):
+        """Add some time spent in a stage, optionally for a group."""
+
+        totals = self.stages[stage]
+        totals[0] += 1
+        totals[1] += seconds
+
+        if group is not None:
+            group_stages = self.groups.setdefault(group, {})
+            group_stages[stage] = group_stages.get(stage, 0.0) + seconds
+
+    def format(self, wall_time=None, top=10):
+        """Return a table of the time spent in each stage, and in the
+        slowest few groups.
+        """
+
+        total = sum(seconds for count, seconds in self.stages.values())
+        lines = ['{0:<12} {1:>8} {2:>10} {3:>10} {4:>7}'.format(
+            'stage', 'count', 'total s', 'mean µs', 'share')]
+
+        for stage, (count, seconds) in self.stages.items():
+            lines.append(
+                '{0:<12} {1:>8} {2:>10.3f} {3:>10.1f} {4:>6.1f}%'.format(
+                    stage, count, seconds,
+                    seconds / count * 1e6 if count else 0,
+                    seconds / total * 100 if total else 0))
+
+        if wall_time is not None:
+            lines.append('{0:<12} {1:>8} {2:>10.3f}'.format('wall time', '',
+                                                          wall_time))
+
+        slowest = sorted(self.groups.items(),
+                         key=lambda group: -sum(group[1].values()))[:top]
+
+        if slowest:
+            lines.append('')
+            lines.append('{0:<20} {1}'.format('slowest', ' '.join(
+                '{0:>10}'.format(stage) for stage in STAGES)))
+
+            for group, group_stages in slowest:
+                lines.append('{0:<20} {1}'.format(group, ' '.join(
+                    '{0:>10.4f}'.format(group_stages.get(stage, 0))
+                    for stage in STAGES)))
+
+        return '\n'.join(lines)
+
+    def merge(self, other):
+        """Add another profile's times to this one."""
+
+        for stage, (count, seconds) in other.stages.items():
+            self.stages[stage][0] += count
+            self.stages[stage][1] += seconds
+
+        for group, group_stages in other.groups.items():
+            for stage, seconds in group_stages.items():
+                mine = self.groups.setdefault(group, {})
+                mine[stage] = mine.get(stage, 0.0) + seconds
+
+    def regroup(self, groups):
+        """Add up the times for each group into bigger groups, given a dict
+        mapping the old groups to the new ones.  Groups missing from the dict
+        are left alone.
+        """
+
+        old_groups = self.groups
+        self.groups = {}
+
+        for group, group_stages in old_groups.items():
+            new_group = self.groups.setdefault(groups.get(group, group), {})
+            for stage, seconds in group_stages.items():
+                new_group[stage] = new_group.get(stage, 0.0) + seconds
+
+    def report(self, wall_time=None):
+        """Return the whole profile as a dict, ready to be saved as JSON."""
+
+        return {
+            'wall_time': wall_time,
+            'stages': {stage: {'count': count, 'seconds': seconds}
+                       for stage, (count, seconds) in self.stages.items()},
+            'groups': self.groups,
+        }
+
+    def stopwatch(self, group=None):
+        """Start timing the stages of something.  Call lap() on the returned
+        stopwatch at the end of each stage.
+        """
+
+        return _Stopwatch(self, group)
+
+class _Stopwatch(object):
+    """Times consecutive stages for a Profile."""
+
+    def __init__(self, profile, group):
+        self.profile = profile
+        self.group = group
+        self.last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.profile.add(stage, now - self.last, self.group)
+        self.last = now
+
+class _NoStopwatch(object):
+    """Stands in for a _Stopwatch when there's no profile, and does nothing."""
+
+    def lap(self, stage):
+        pass
+
+_no_stopwatch = _NoStopwatch()
+
+def _untile_order():
+    """Work out where each pixel of an untiled sprite comes from.  Sprites are
+    stored as a 5×5 grid of 8×8 tiles, one tile at a time.
+    """
+
+    order = [None] * 1600
+
+    for tile in range(25):
+        tile_x = tile % 5
+        tile_y = tile // 5
+
+        for pixel in range(64):
+            pixel_x = pixel % 8
+            pixel_y = pixel // 8
+
+            x = tile_x * 8 + pixel_x
+            y = tile_y * 8 + pixel_y
+
+            order[y * 40 + x] = tile * 64 + pixel
+
+    return order
+
+# Pull tiled pixels into rows all at once, and back again
+_untile = itemgetter(*_untile_order())
+_tile = itemgetter(*sorted(range(1600), key=_untile_order().__getitem__))
+
+@lru_cache()
+def _numpy():
+    """Import NumPy.  Return it, plus an index for untiling sprites with it."""
+
+    import numpy
+    return numpy, numpy.array(_untile_order(), dtype=numpy.intp)
+
+# Five-bit channels scaled up to eight bits, the same way pypng does it
+_eight_bit_channels = [int(round(channel * 255 / 31)) for channel in range(32)]
+
+# Translation tables for splitting each byte of a sprite into two pixels
+_low_nybbles = bytes(pixel_pair & 0xf for pixel_pair in range(0x100))
+_high_nybbles = bytes(pixel_pair >> 4 for pixel_pair in range(0x100))
+
+# Worker processes' portrait file; see run_jobs()
+_worker_kaomado = None
+
+def _init_worker(kaomado):
+    """Set up a worker process for run_jobs()."""
+
+    global _worker_kaomado
+    _worker_kaomado = kaomado
+
+def _run_job(function, args):
+    """Run one of run_jobs()'s jobs in a worker process."""
+
+    return function(_worker_kaomado, *args)
+
+def _run_profiled_job(function, args):
+    """Run one of run_jobs()'s jobs in a worker process, with a profile of its
+    own to send back.
+    """
+
+    profile = Profile()
+    return function(_worker_kaomado, *args, profile=profile), profile
+
+def _pool_results(pool, results, profile=None):
+    """Yield the results of iter_jobs()'s jobs from a pool, merging their
+    profiles into the given one, and shut the pool down afterwards.
+    """
+
+    with pool:
+        # This also reraises any errors
+        if profile is None:
+            yield from results
+            return
+
+        for result, job_profile in results:
+            profile.merge(job_profile)
+            yield result
+
+def _choose_controls(pattern_hits, length_hits, pattern_count):
+    """Pick a list of control codes for compressing some data, given how
+    often each kind of pattern and each back-reference length would come up in
+    it.  Return the list, plus a dict of the pairs of bytes it has patterns
+    for.
+
+    Every nybble that's a control code is one back-reference length that can't
+    be used, so this uses the given number of pattern kinds, picking the ones
+    that come up most and giving up the lengths that come up least.  The
+    first pattern kind is always used, because the first control code can't be
+    anything else.
+    """
+
+    pattern_kinds = [0] + sorted(range(1, 9), key=lambda control:
+                                 -pattern_hits[control])[:pattern_count - 1]
+    highs = sorted(range(0x10), key=lambda high: length_hits[high])
+
+    # Unused pattern kinds just repeat the first control code, which doesn't
+    # count a second time
+    controls = [highs[0]] * 9
+    patterns = {}
+    for control, high in zip(pattern_kinds, highs):
+        controls[control] = high
+        for pair, low in _pattern_lows[control].items():
+            patterns[bytes(pair)] = high << 4 | low
+
+    return controls, patterns
+
+def _find_matches(data, chain_length):
+    """Find the longest earlier match for each position in some data,
+    following hash chains of three-byte prefixes no more than the given
+    number of links.  Return a list of (length, distance) pairs, with a length
+    of zero where there's no match worth having.
+    """
+
+    size = len(data)
+    matches = [(0, 0)] * size
+    heads = {}
+    links = [None] * size
+
+    for position in range(size - 2):
+        prefix = data[position:position + 3]
+        candidate = heads.get(prefix)
+        heads[prefix] = position
+        links[position] = candidate
+
+        best_length = 0
+        best_distance = 0
+        max_length = min(18, size - position)
+        chain = chain_length
+
+        while (candidate is not None and chain and
+               position - candidate <= _window_size):
+            # The match can run past the current position; decompress()
+            # copies overlapping sequences the same way
+            length = 3
+            while (length < max_length and
+                   data[candidate + length] == data[position + length]):
+                length += 1
+
+            if length > best_length:
+                best_length = length
+                best_distance = position - candidate
+
+                if length == max_length:
+                    break
+
+            candidate = links[candidate]
+            chain -= 1
+
+        matches[position] = (best_length, best_distance)
+
+    return matches
+
+def _parse(data, matches, patterns, lengths):
+    """Work out the cheapest way to compress some data, given the matches from
+    _find_matches(), a dict of the pairs of bytes there are patterns for, and
+    the back-reference lengths that can be used.
+
+    Return the total cost in bits, and what to do at each position: 1 for a
+    literal byte, 2 for a pattern, or minus the length of a back-reference.
+    Only the positions along the cheapest path actually get used.
+    """
+
+    size = len(data)
+    cost = [0] * (size + 1)
+    steps = [None] * size
+
+    # Work backwards from the end: nine bits for a literal byte or a pattern,
+    # seventeen for a back-reference
+    for position in range(size - 1, -1, -1):
+        cost[position] = 9 + cost[position + 1]
+        steps[position] = 1
+
+        if (data[position:position + 2] in patterns and
+                9 + cost[position + 2] < cost[position]):
+            cost[position] = 9 + cost[position + 2]
+            steps[position] = 2
 
-import tables
+        for length in lengths:
+            if length > matches[position][0]:
+                break
 
-SKY = 'sky'
-BLUE = 'blue'
-version = None
+            if 17 + cost[position + length] < cost[position]:
+                cost[position] = 17 + cost[position + length]
+                steps[position] = -length
+
+    return cost[0], steps
+
+def _encode_sprite(kaomado, filename, offset, backend=DEFAULT_BACKEND,
+                   mode=TRUECOLOR, profile=None):
+    """Decode a single portrait sprite and encode it as a PNG, with the given
+    backend and mode.  Return the PNG.
+
+    Given a profile, time each stage under the filename.
+    """
+
+    if profile is not None:
+        stopwatch = profile.stopwatch(filename)
+    else:
+        stopwatch = _no_stopwatch
+
+    # Get the palette and extract the actual sprite
+    palette, offset = parse_palette(kaomado.data, offset,
+                                    kaomado.palette_stride)
+    stopwatch.lap('read')
+
+    sprite, end = decompress(kaomado.data, offset)
+    stopwatch.lap('decompress')
+
+    rows, palette = _png_rows(sprite, palette, mode, backend)
+    stopwatch.lap('unscramble')
+
+    sprite = _write_png(rows, palette)
+    stopwatch.lap('encode')
+
+    return sprite
+
+def _etag_matches(if_none_match, etag):
+    """Return whether an If-None-Match header says the client already has the
+    given ETag: a list of ETags, weak or not, or *.
+    """
+
+    if if_none_match is None:
+        return False
+
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+
+        if tag in ('*', etag):
+            return True
+
+    return False
+
+def _file_digest(filename):
+    """Hash a whole file."""
+
+    with open(filename, 'rb') as digest_file:
+        return hashlib.sha1(digest_file.read()).hexdigest()
+
+def _iter_portraits(kaomado, version):
+    """Do the actual work of iter_portraits()."""
+
+    if version is not None and kaomado.version != version:
+        raise ValueError('expected a portrait file from {0}, not {1}'.format(
+            version, kaomado.version))
+
+    for pokemon_id, sprite_num, offset in kaomado.sprites():
+        pokemon, expression, is_right = kaomado.describe(pokemon_id,
+                                                         sprite_num)
+        palette, sprite, end = kaomado.decode(offset)
+
+        yield Portrait(pokemon, expression, is_right, palette, untile(sprite))
+
+def _png_rows(sprite, palette, mode=TRUECOLOR, backend=DEFAULT_BACKEND):
+    """Unscramble a raw sprite into rows for _write_png().  Return the rows,
+    and the palette to write them with, if any.
+    """
+
+    if mode == INDEXED:
+        # No need to expand the palette; the pixels are already indices
+        pixels = untile(sprite)
+        return [pixels[y:y + 40] for y in range(0, 1600, 40)], palette
+    else:
+        return unscramble_rows(sprite, palette, backend), None
+
+def _relative_filename(pokemon, expression, is_right):
+    """Like build_filename(), but relative to the output directory and always
+    with forward slashes, as used everywhere portraits are planned out.
+    """
+
+    if expression != tables.expressions.STANDARD:
+        filename = '{0}-{1}.png'.format(pokemon.identifier, expression)
+    else:
+        filename = '{0}.png'.format(pokemon.identifier)
+
+    if is_right:
+        filename = 'right/' + filename
+
+    if pokemon.is_female:
+        filename = 'female/' + filename
+
+    return filename
+
+def _sink(output):
+    """Wrap an output directory in a DirectorySink, unless it's already an
+    OutputSink.
+    """
+
+    if isinstance(output, OutputSink):
+        return output
+
+    return DirectorySink(output)
+
+def _write_png(rows, palette=None):
+    """Write a PNG to bytes.  Without a palette, the rows are flat five-bit
+    RGB channels; with one, they're four-bit indices into the palette.
+    """
+
+    png_file = io.BytesIO()
+
+    if palette is not None:
+        palette = [
+            tuple(_eight_bit_channels[channel] for channel in color)
+            for color in palette
+        ]
+
+        writer = png.Writer(40, len(rows), palette=palette, bitdepth=4)
+        writer.write(png_file, rows)
+    else:
+        png.from_array(rows, mode='RGB;5').write(png_file)
+
+    return png_file.getvalue()
+
+def apply_palette(pixels, palette):
+    """Apply a palette to an untiled sprite, as from untile()."""
+
+    # Apply the palette one channel at a time.  Each row is a flat list of RGB
+    # channels because, at the time of writing, image[y][x][channel] doesn't
+    # actually work with png.from_array().
+    image = bytearray(len(pixels) * 3)
+
+    for channel in range(3):
+        channels = bytes(color[channel] for color in palette)
+        image[channel::3] = pixels.translate(channels.ljust(0x100, b'\x00'))
+
+    return [image[y:y + 120] for y in range(0, len(image), 120)]
+
+def build_atlas(images, output_dir, filename):
+    """Pack a list of (entry, image) pairs into one atlas image as a grid of
+    portraits, where each image is flat RGB channels as from unscramble_image().
+    Save the atlas as a PNG and return the entries with their rectangles
+    filled in.
+    """
+
+    columns = math.ceil(math.sqrt(len(images)))
+    rows = math.ceil(len(images) / columns)
+    row_length = columns * 120
+
+    atlas = bytearray(row_length * rows * 40)
+    entries = []
+
+    for n, (entry, image) in enumerate(images):
+        x = n % columns * 40
+        y = n // columns * 40
+
+        for sprite_y in range(40):
+            start = (y + sprite_y) * row_length + x * 3
+            atlas[start:start + 120] = image[sprite_y * 120:
+                                             (sprite_y + 1) * 120]
+
+        entry = dict(entry, x=x, y=y, width=40, height=40)
+        entries.append(entry)
+
+    atlas = [atlas[y:y + row_length]
+             for y in range(0, len(atlas), row_length)]
+
+    filename = os.path.join(output_dir, filename)
+    makedirs_if_need_be(os.path.dirname(filename))
+    png.from_array(atlas, mode='RGB;5').save(filename)
+
+    return entries
 
 def build_filename(pokemon, expression, is_right, output_dir):
     """Determine an output filename for a sprite given the Pokémon it
@@ -39,84 +1732,351 @@ def build_filename(pokemon, expression, is_right, output_dir):
     facing, and the base output directory.
     """
 
-    filename = [output_dir]
+    filename = _relative_filename(pokemon, expression, is_right)
+    return os.path.join(output_dir, *filename.split('/'))
 
-    if pokemon.is_female:
-        filename.append('female')
+def build_portrait(palette, pixels, effort=6):
+    """Pack a palette and untiled pixels, as from read_png(), into a portrait
+    the way kaomado.kao stores them: the raw palette, then the compressed
+    sprite.  Return it as bytes.
+    """
 
-    if is_right:
-        filename.append('right')
+    raw_palette = bytearray()
+    for color in palette:
+        raw_palette.extend(channel << 3 for channel in color)
 
-    if expression != tables.expressions.STANDARD:
-        filename.append('{0}-{1}.png'.format(pokemon.identifier, expression))
+    sprite = tile(pixels)
+    stream = compress(sprite, effort)
+    check_compressed(sprite, stream)
+
+    return bytes(raw_palette) + stream
+
+def check_backends(kaomado):
+    """Unscramble every sprite in a portrait file with every available
+    backend, and make sure they all come out exactly the same.  Return the
+    number of sprites checked.
+    """
+
+    sprite_count = 0
+
+    for pokemon_id, sprite_num, offset in kaomado.sprites():
+        palette, sprite, end = kaomado.decode(offset)
+
+        images = [
+            b''.join(bytes(row) for row in
+                     unscramble_rows(sprite, palette, backend))
+            for backend in BACKENDS
+        ]
+
+        if any(image != images[0] for image in images):
+            raise ValueError(
+                'backends disagree on sprite at {0:#x}'.format(offset))
+
+        sprite_count += 1
+
+    return sprite_count
+
+def check_compressed(data, stream):
+    """Make sure an AT4PX stream from compress() decompresses back to exactly
+    the given data, and ends where its header says it does.  Raise ValueError
+    if not.
+    """
+
+    decompressed, end = decompress(stream, 0)
+
+    if decompressed != data:
+        raise ValueError("compressed stream doesn't decompress to its data")
+    elif end != len(stream) or end != unpack_from('<H', stream, 5)[0]:
+        raise ValueError("compressed stream's length is wrong")
+
+def compress(data, effort=6):
+    """Compress a raw sprite, or any data, into an AT4PX stream that
+    decompress() can read.  Return the stream, header and all.
+
+    The effort goes from 0 to 9.  More effort follows longer hash chains when
+    looking for back-references (2 ** effort links at most), and from 7 up,
+    tries every number of pattern control codes instead of guessing.
+    """
+
+    if not 0 <= effort <= 9:
+        raise ValueError('effort must be from 0 to 9')
+
+    data = bytes(data)
+    size = len(data)
+    if size > 0xffff:
+        raise ValueError('too much data for one AT4PX stream')
+
+    matches = _find_matches(data, 1 << effort)
+
+    # Only so many nybbles can go around, so start by parsing the data as if
+    # every pattern and every back-reference length could be used at once,
+    # and see which of them come up
+    cost, steps = _parse(data, matches, _pattern_kinds, range(3, 19))
+
+    pattern_hits = [0] * 9
+    length_hits = [0] * 0x10
+    position = 0
+    while position < size:
+        step = steps[position]
+
+        if step == 2:
+            pattern_hits[_pattern_kinds[data[position:position + 2]]] += 1
+        elif step < 0:
+            length_hits[-step - 3] += 1
+
+        position += abs(step)
+
+    if effort >= 7:
+        pattern_counts = range(1, 10)
     else:
-        filename.append('{0}.png'.format(pokemon.identifier))
+        # Add pattern kinds while they'd be used more than the lengths they
+        # push out
+        kind_hits = sorted(pattern_hits[1:], reverse=True)
+        high_hits = sorted(length_hits)
+        pattern_count = 1
+        while (pattern_count < 9 and kind_hits[pattern_count - 1] >
+               high_hits[pattern_count]):
+            pattern_count += 1
+
+        pattern_counts = [pattern_count]
+
+    best = None
+
+    for pattern_count in pattern_counts:
+        controls, patterns = _choose_controls(pattern_hits, length_hits,
+                                              pattern_count)
+        lengths = [high + 3 for high in range(0x10) if high not in controls]
+        cost, steps = _parse(data, matches, patterns, lengths)
+
+        if best is None or cost < best[0]:
+            best = cost, controls, patterns, steps
+
+    cost, controls, patterns, steps = best
+
+    # Now actually encode it, eight flags at a time
+    body = bytearray()
+    flags_at = None
+    flag = 8
+    position = 0
+
+    while position < size:
+        if flag == 8:
+            flags_at = len(body)
+            body.append(0)
+            flag = 0
+
+        step = steps[position]
+
+        if step == 1:
+            body[flags_at] |= 0x80 >> flag
+            body.append(data[position])
+            position += 1
+        elif step == 2:
+            body.append(patterns[data[position:position + 2]])
+            position += 2
+        else:
+            length = -step
+            # Distances are stored as how far short of the window they fall
+            encoded = _window_size - matches[position][1]
+            body.append((length - 3) << 4 | encoded >> 8)
+            body.append(encoded & 0xff)
+            position += length
 
-    return os.path.join(*filename)
+        flag += 1
 
-def decompress(kaomado):
-    """Decompress a sprite at the current offset."""
+    if 18 + len(body) > 0xffff:
+        raise ValueError('compressed data is too long for one AT4PX stream')
+
+    header = b'AT4PX' + (18 + len(body)).to_bytes(2, 'little')
+    header += bytes(controls) + size.to_bytes(2, 'little')
+    return header + bytes(body)
+
+def decompress(kaomado, offset):
+    """Decompress a sprite starting at the given offset into a buffer of
+    portrait data.
+
+    Return the decompressed sprite and the offset just past the end of the
+    compressed data.
+    """
 
-    if kaomado.read(5) != b'AT4PX':
+    if kaomado[offset:offset + 5] != b'AT4PX':
         raise ValueError('wrong magic bytes for compressed sprite')
 
-    kaomado.seek(2, os.SEEK_CUR)  # Compressed length; we don't use this
+    # Next two bytes are the compressed length; we don't use this
 
-    # The control codes used for 0-flags vary from sprite to sprite
-    controls = list(kaomado.read(9))
+    # The control codes used for 0-flags vary from sprite to sprite.  Only the
+    # first occurrence of each one counts.
+    controls = {}
+    for control, high in enumerate(kaomado[offset + 7:offset + 16]):
+        controls.setdefault(high, control)
 
-    length, = unpack('<H', kaomado.read(2))
+    length, = unpack_from('<H', kaomado, offset + 16)
+    offset += 18
 
     data = bytearray()
     while len(data) < length:
-        flags, = kaomado.read(1)
+        flags = kaomado[offset]
+        offset += 1
+
         for flag in range(8):
             if flags & (0x80 >> flag):
                 # Flag 1: append one byte as-is
-                data.extend(kaomado.read(1))
+                data.append(kaomado[offset])
+                offset += 1
             else:
                 # Flag 0: do one of two fancy things based on the next byte's
                 # high and low nybbles
-                control, = kaomado.read(1)
+                control = kaomado[offset]
+                offset += 1
                 high, low = control >> 4, control & 0xf
 
                 if high in controls:
                     # Append a pattern of four pixels.  The high bits determine
                     # the pattern, and the low bits determine the base pixel.
-                    control = controls.index(high)
-                    pixels = [low] * 4
-
-                    if control == 0:
-                        pass
-                    elif 1 <= control <= 4:
-                        # Lower a particular pixel
-                        if control == 1:
-                            pixels = [low + 1] * 4
-                        pixels[control - 1] -= 1
-                    else:
-                        # 5 <= control <= 8; raise a particular pixel
-                        if control == 5:
-                            pixels = [low - 1] * 4
-                        pixels[control - 5] += 1
-
-                    # Pack the pixels into bytes and append them
-                    data.extend((pixels[0] << 4 | pixels[1],
-                                 pixels[2] << 4 | pixels[3]))
+                    data.extend(_pixel_patterns[controls[high]][low])
                 else:
-                   # Append a sequence of bytes previously used in the sprite.
-                   # This can overlap with the beginning of the appended bytes!
-                   # The high bits determine the length of the sequence, and
-                   # the low bits help determine the where the sequence starts.
-                   offset = -0x1000
-                   offset += (low << 8) | kaomado.read(1)[0]
-
-                   for b in range(high + 3):
-                       data.append(data[offset])
+                    # Append a sequence of bytes previously used in the sprite.
+                    # This can overlap with the beginning of the appended
+                    # bytes!  The high bits determine the length of the
+                    # sequence, and the low bits help determine the where the
+                    # sequence starts.
+                    distance = 0x1000 - ((low << 8) | kaomado[offset])
+                    offset += 1
+                    sequence_length = high + 3
+                    start = len(data) - distance
+
+                    if start < 0:
+                        raise ValueError('sprite refers back past its start')
+                    elif distance >= sequence_length:
+                        # No overlap; copy the whole thing at once
+                        data += data[start:start + sequence_length]
+                    else:
+                        # Overlap: the last few bytes repeat until the sequence
+                        # is long enough
+                        repeats = sequence_length // distance + 1
+                        data += (data[start:] * repeats)[:sequence_length]
 
             if len(data) == length:
                 break
 
-    return data
+    return data, offset
+
+def encode_pixels(pixels, palette, mode=TRUECOLOR):
+    """Encode an untiled sprite, as from untile(), as a PNG.  Return the PNG
+    as bytes.
+    """
+
+    if mode == INDEXED:
+        rows = [pixels[y:y + 40] for y in range(0, 1600, 40)]
+        return _write_png(rows, palette)
+    else:
+        return _write_png(apply_palette(pixels, palette))
+
+def encode_png(sprite, palette, mode=TRUECOLOR, backend=DEFAULT_BACKEND):
+    """Encode a raw sprite as a PNG, either in truecolor or indexed with the
+    sprite's own palette.  Return the PNG as bytes.
+    """
+
+    return _write_png(*_png_rows(sprite, palette, mode, backend))
+
+def iter_jobs(function, kaomado, jobs_args, jobs=1, profile=None):
+    """Call function(kaomado, *args) for each tuple of args, and return an
+    iterator over the results, in order as they come in.
+
+    If more than one job is asked for, spread the calls across that many worker
+    processes.  Each worker maps the portrait file for itself.
+
+    Given a profile, the function is passed it too, as profile=profile.
+    Workers time their jobs separately, and it all gets merged back into the
+    given profile.
+    """
+
+    if jobs == 1:
+        if profile is not None:
+            function = partial(function, profile=profile)
+
+        return (function(kaomado, *args) for args in jobs_args)
+
+    # Hand out work in a few chunks per worker to keep the overhead down
+    jobs_args = list(jobs_args)
+    if not jobs_args:
+        return iter([])
+
+    chunksize = max(1, len(jobs_args) // (jobs * 4))
+
+    import multiprocessing
+
+    # The workers are forked right away, rather than when the first result is
+    # asked for, in case the caller starts any threads in the meantime
+    pool = multiprocessing.Pool(jobs, _init_worker, (kaomado,))
+
+    if profile is None:
+        results = pool.imap(partial(_run_job, function), jobs_args, chunksize)
+    else:
+        results = pool.imap(partial(_run_profiled_job, function), jobs_args,
+                            chunksize)
+
+    return _pool_results(pool, results, profile)
+
+def iter_portraits(kaomado, version=None):
+    """Iterate over every portrait in a portrait file, decoding each one as
+    it's needed.  Yield a Portrait for each.
+
+    The portrait file can be a path or an already-open PortraitFile.  If a
+    version is given, make sure the file is actually from that game.
+    """
+
+    if isinstance(kaomado, PortraitFile):
+        yield from _iter_portraits(kaomado, version)
+    else:
+        with open_portrait_file(kaomado) as kaomado:
+            yield from _iter_portraits(kaomado, version)
+
+def link_duplicate(output_dir, source, filename, duplicates=COPY):
+    """Make a PNG a duplicate of another, both relative to the output
+    directory, by copying it or linking to it.
+    """
+
+    source = os.path.join(output_dir, source)
+    filename = os.path.join(output_dir, filename)
+    temp_filename = filename + '.tmp'
+
+    if duplicates == HARDLINK:
+        os.link(source, temp_filename)
+    elif duplicates == SYMLINK:
+        source = os.path.relpath(source, os.path.dirname(filename))
+        os.symlink(source, temp_filename)
+    else:
+        shutil.copyfile(source, temp_filename)
+
+    os.replace(temp_filename, filename)
+
+def load_manifest(output_dir, mode, duplicates):
+    """Load the manifest of an earlier incremental rip.  It has three dicts:
+    'files' maps each PNG's filename to the digest of the portrait it came
+    from, 'links' maps each duplicate PNG's filename to the PNG it was copied
+    or linked from, and 'pngs' maps each PNG's filename to the digest of the
+    PNG itself, so that edited PNGs can be spotted.  'source' is the digest of
+    the whole portrait file that was ripped.
+
+    If there's no manifest, or it was for a different output mode or way of
+    handling duplicates, return an empty one.
+    """
+
+    empty = {'mode': mode, 'duplicates': duplicates, 'files': {}, 'links': {},
+             'pngs': {}}
+
+    try:
+        with open(os.path.join(output_dir, MANIFEST)) as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        return empty
+
+    if manifest['mode'] != mode or manifest['duplicates'] != duplicates:
+        return empty
+
+    manifest.setdefault('pngs', {})
+    return manifest
 
 def makedirs_if_need_be(leaf_directory):
     """Create the given directory and its parents as needed, but don't break if
@@ -132,27 +2092,53 @@ def makedirs_if_need_be(leaf_directory):
         else:
             raise e
 
-def parse_palette(kaomado):
-    """Parse an RGB palette at the current offset: sixteen colors, five bits
-    per channel.
+def open_portrait_file(path):
+    """Open and memory-map a portrait file, figuring out which game it's from
+    based on its first few bytes.
+    """
 
-    Each channel gets its own byte, for some reason, as opposed to the usual
-    NTFP color format which actually fits all three into fifteen bits.
+    with open(path, 'rb') as portrait_file:
+        magic = portrait_file.read(5)
 
-    In PMD: Blue, each palette entry is padded to four bytes with 0x80 and I
-    don't know why.
+    if magic == b'\x00\x00\x00\x00\x00':
+        return KaomadoFile(path)
+    elif magic == b'ax001':
+        return MonsterSbin(path)
+    else:
+        raise ValueError('unrecognized portrait file')
+
+def open_sink(path, output_format=DIRECTORY):
+    """Open an OutputSink that writes to the given path, as a directory or as
+    one of the archive formats in OUTPUTS.
+    """
+
+    if output_format == ZIP:
+        return ZipSink(path)
+    elif output_format == ZIP_STORED:
+        return ZipSink(path, deflate=False)
+    elif output_format == TAR:
+        return TarSink(path)
+    else:
+        return DirectorySink(path)
+
+def parse_palette(kaomado, offset, stride=3):
+    """Parse an RGB palette at the given offset: sixteen colors, five bits per
+    channel.  Return the palette and the offset just past its end.
+
+    Each channel gets its own byte, for some reason, as opposed to the usual
+    NTFP color format which actually fits all three into fifteen bits.  The
+    stride is the number of bytes each color actually takes up.
     """
 
     palette = []
     for color in range(0x10):
         palette.append(tuple(
-            channel >> 3 for channel in kaomado.read(3)
+            channel >> 3 for channel in kaomado[offset:offset + 3]
         ))
 
-        if version == BLUE:
-            kaomado.seek(1, os.SEEK_CUR)
+        offset += stride
 
-    return palette
+    return palette, offset
 
 def pixel_iterator(sprite):
     """Iterate over raw sprite data pixel by pixel."""
@@ -161,140 +2147,984 @@ def pixel_iterator(sprite):
         yield pixel_pair & 0xf
         yield pixel_pair >> 4
 
-def rip_blue(kaomado, output_dir):
-    """Rip portrait sprites from Blue Rescue Team's monster.sbin.  Or at least
-    the important ones.
+def plan_output(output_dir, filenames):
+    """Create every directory the given PNGs need, in one pass, and return
+    the set of those PNGs that already exist.  Filenames are relative to the
+    output directory, with forward slashes, as from portrait_filenames().
+
+    This makes one or two filesystem calls per directory up front, so that
+    ripping doesn't have to check on anything PNG by PNG.
+    """
+
+    directories = {''}
+    for filename in filenames:
+        directory = posixpath.dirname(filename)
+        while directory not in directories:
+            directories.add(directory)
+            directory = posixpath.dirname(directory)
+
+    os.makedirs(output_dir, exist_ok=True)
+    existing = set()
+
+    # Parents sort before their subdirectories
+    for directory in sorted(directories):
+        path = os.path.join(output_dir, *directory.split('/'))
+
+        if directory:
+            try:
+                os.mkdir(path)
+                continue  # Nothing in it yet, then
+            except FileExistsError:
+                pass
+
+        prefix = directory + '/' if directory else ''
+        with os.scandir(path) as entries:
+            existing.update(prefix + entry.name for entry in entries)
+
+    return existing
+
+def portrait_filenames(kaomado):
+    """Work out where every portrait sprite in a portrait file should be
+    saved.  Return a dict of filenames, relative to the output directory, and
+    the offsets of the sprites that go there.
+    """
+
+    # Some Pokémon have more than one sprite for the same expression, and only
+    # the last one would survive anyway
+    sprites = {}
+    for pokemon_id, sprite_num, offset in kaomado.sprites():
+        pokemon, expression, is_right = kaomado.describe(pokemon_id,
+                                                         sprite_num)
+        sprites[_relative_filename(pokemon, expression, is_right)] = offset
+
+        # Default forms get duplicated under the plain national ID
+        if (pokemon.is_default_form and
+                expression == tables.expressions.STANDARD):
+            filename = _relative_filename(pokemon._replace(form=None),
+                                          expression, is_right)
+            sprites[filename] = offset
+
+    return sprites
+
+def read_png(filename, palette=None):
+    """Read a 40×40 portrait PNG with at most sixteen colors.  Return its
+    palette of five-bit RGB colors and its pixels as indices into it, row by
+    row, like untile().
+
+    Indexed PNGs keep their own palette.  Otherwise, the given palette is used
+    if it has every color in the image, so that an edited portrait can keep
+    its old palette; failing that, the colors go in the order they turn up.
     """
 
-    for pokemon_header in range(0x1a70, 0x1ef0, 0x10):
-        # Deliberately skipping the last one because it's a dupe Rayquaza
-        kaomado.seek(pokemon_header)
+    reader = png.Reader(filename=filename)
+    width, height, rows, info = reader.read()
+
+    if (width, height) != (40, 40):
+        raise ValueError('{0} is {1}×{2}, not 40×40'.format(
+            filename, width, height))
+
+    if 'palette' in info:
+        if len(info['palette']) > 0x10:
+            raise ValueError('{0} has more than 16 colors'.format(filename))
+
+        # pypng gives back the eight-bit palette that _write_png() made
+        palette = [
+            tuple(int(round(channel * 31 / 255)) for channel in color[:3])
+            for color in info['palette']
+        ]
+        palette += [(0, 0, 0)] * (0x10 - len(palette))
+
+        pixels = bytes(pixel for row in rows for pixel in row)
+        if max(pixels) >= 0x10:
+            raise ValueError('{0} has more than 16 colors'.format(filename))
+
+        return palette, pixels
+
+    # Anything else gets turned into five-bit RGB.  PNGs from _write_png()
+    # are already five-bit, thanks to their sBIT chunk.
+    reader = png.Reader(filename=filename)
+    width, height, rows, info = reader.asDirect()
+    max_value = 2 ** info['bitdepth'] - 1
+    planes = info['planes']
+
+    # Scaling channels through a table is much quicker than one by one
+    if max_value <= 0xff:
+        scale = bytes(int(round(value * 31 / max_value))
+                      for value in range(max_value + 1)).ljust(0x100, b'\0')
+        rows = (bytes(row).translate(scale) for row in rows)
+    else:
+        rows = ([int(round(value * 31 / max_value)) for value in row]
+                for row in rows)
 
-        # Read the label, figure out which Pokémon it means
-        label = kaomado.read(8).rstrip(b'\x00').decode('ASCII')
-        assert label.startswith('kao')
-        pokemon = int(label[3:])
-        pokemon = tables.pokemon.blue[pokemon]
+    colors = []
+    for row in rows:
+        if info['greyscale']:
+            colors.extend((value,) * 3 for value in row[::planes])
+        else:
+            colors.extend(zip(row[0::planes], row[1::planes],
+                              row[2::planes]))
+
+    used = list(OrderedDict.fromkeys(colors))
+    if len(used) > 0x10:
+        raise ValueError('{0} has more than 16 colors'.format(filename))
+
+    if palette is None or not set(used) <= set(palette):
+        palette = used + [(0, 0, 0)] * (0x10 - len(used))
+
+    indices = {}
+    for index, color in enumerate(palette):
+        indices.setdefault(tuple(color), index)
+
+    return palette, bytes(map(indices.__getitem__, colors))
+
+def rebuild_sky(input_dir, output_path, base=None, effort=6):
+    """Rebuild Explorers of Sky's kaomado.kao from a directory of portrait
+    PNGs laid out like a rip.  Return how many portraits were copied from the
+    base file as they were, and how many were compressed from PNGs.
+
+    Given a base kaomado.kao, any portrait whose PNG hasn't been touched since
+    an incremental rip of that same portrait, or of that same file, is copied
+    straight from it, without being compressed again.  Without a manifest to
+    say so, a PNG is decoded and compared with the base file's portrait
+    instead, and copied the same way if they look exactly alike.  The base
+    file also supplies the sprites that never get ripped because they're
+    junk, any sprite with no PNG, and any sprite that shares its PNG with
+    another one that the PNG was actually ripped from.  Without a base file,
+    sprites with no PNG are left out, unless the rip's manifest or
+    aliases.json says there should be one: then ValueError is raised.
+    """
 
-        # We only get one offset where all that Pokémon's portraits are packed
-        pointer, length = unpack('<2L', kaomado.read(8))
-        kaomado.seek(pointer)
+    if base is not None and base.version != SKY:
+        raise ValueError("only Sky's kaomado.kao can be rebuilt")
 
-        # Find the portrait block, figure out where it ends
-        assert kaomado.read(4) == b'SIR0'
-        sprites_length, = unpack('<L', kaomado.read(4))
-        sprites_end = pointer + sprites_length
-        kaomado.seek(8, os.SEEK_CUR)  # I don't know what this is
+    try:
+        with open(os.path.join(input_dir, MANIFEST)) as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        manifest = {}
 
-        sprite_num = 0
-        while kaomado.tell() < sprites_end:
-            expression, is_right = tables.expressions.blue(pokemon, sprite_num)
+    # Duplicates ripped in alias mode are only listed in aliases.json, and
+    # without --incremental there's no manifest at all
+    try:
+        with open(os.path.join(input_dir, ALIASES)) as aliases_file:
+            old_links = json.load(aliases_file)
+    except FileNotFoundError:
+        old_links = {}
+
+    old_digests = manifest.get('files', {})
+    old_links.update(manifest.get('links', {}))
+    old_pngs = manifest.get('pngs', {})
+
+    # A rip of this very file can keep every portrait whose PNG is untouched,
+    # even where several sprites share a PNG; otherwise, a portrait has to
+    # match the one its PNG was ripped from
+    from_base = (base is not None and
+                 manifest.get('source') == base.file_digest())
+
+    # Every PNG the rip is known to have written or listed
+    ripped = set(old_digests) | set(old_links)
+
+    # Where in the base file each PNG would have been ripped from
+    if base is not None:
+        ripped_from = portrait_filenames(base)
+
+    table_size = KaomadoFile.table_size
+    table = bytearray(table_size)
+    portraits = bytearray()
+
+    # Identical portraits share a pointer, and each PNG is only compressed
+    # once even if several sprites use it
+    pointers = {}
+    built = {}
+    copied = 0
+
+    for internal_id in range(1, table_size // 0xa0):
+        pokemon = tables.pokemon.sky.get(internal_id)
+        if pokemon is not None:
+            expressions = tables.expressions.sky_table[internal_id]
+
+        for sprite_num in range(40):
+            base_offset = None
+            if base is not None:
+                pointer = base.pointers(internal_id)[sprite_num]
+                if base.is_sprite(pointer):
+                    base_offset = pointer
+
+            expression = None
+            if pokemon is not None and expressions[sprite_num] is not None:
+                expression, is_right = expressions[sprite_num]
+
+            portrait = None
 
             if expression is None:
-                # Only Skarmory has a placeholder; second and last in its block
-                break
+                # Junk sprites never get ripped, so keep whatever was there
+                if base_offset is not None:
+                    portrait = base.raw(base_offset)
+            else:
+                filename = _relative_filename(pokemon, expression, is_right)
+
+                # Duplicates might only be listed in the manifest or aliases
+                source = filename
+                if not os.path.exists(os.path.join(input_dir, source)):
+                    source = old_links.get(filename, filename)
+
+                path = os.path.join(input_dir, source)
+
+                # Several sprites can share a PNG, but only one of them (and
+                # any identical to it) was ripped to it; the rest, junk
+                # included, keep whatever the base file has.  PNGs the base
+                # file never had can go anywhere they belong.
+                ripped_here = True
+                if base is not None and filename in ripped_from:
+                    ripped_here = (
+                        base_offset is not None and
+                        base.digest(base_offset) ==
+                        base.digest(ripped_from[filename])
+                    )
+
+                if not ripped_here:
+                    if base_offset is not None:
+                        portrait = base.raw(base_offset)
+                        copied += 1
+                elif not os.path.exists(path):
+                    if base_offset is not None:
+                        portrait = base.raw(base_offset)
+                        copied += 1
+                    elif filename not in ripped:
+                        # Nothing was ever ripped here
+                        pass
+                    else:
+                        raise ValueError('{0} is missing, but the rip says '
+                                         'there should be one'.format(source))
+                elif (old_pngs.get(source) == _file_digest(path) and
+                      (from_base or
+                       base_offset is not None and
+                       base.digest(base_offset) == old_digests.get(filename))):
+                    # The PNG hasn't changed since it was ripped from the base
+                    # file, so keep whatever the base file has here
+                    if base_offset is not None:
+                        portrait = base.raw(base_offset)
+                        copied += 1
+                elif base_offset is None and source in built:
+                    portrait = built[source]
+                else:
+                    base_palette = None
+                    if base_offset is not None:
+                        base_palette, sprite, end = base.decode(base_offset)
+
+                    palette, pixels = read_png(path, base_palette)
+
+                    if (base_palette is not None and
+                            [palette[pixel] for pixel in pixels] ==
+                            [base_palette[pixel] for pixel in untile(sprite)]):
+                        # Without a manifest to go by, the PNG still looks
+                        # exactly like the base file's portrait
+                        portrait = base.raw(base_offset)
+                        copied += 1
+                    elif source in built:
+                        portrait = built[source]
+                    else:
+                        portrait = build_portrait(palette, pixels,
+                                                  effort=effort)
+                        built[source] = portrait
+
+            if portrait is None:
+                # Same junk pointer as the real thing: minus wherever the next
+                # portrait would go
+                pointer = -(table_size + len(portraits)) & 0xffffffff
+            elif portrait in pointers:
+                pointer = pointers[portrait]
+            else:
+                pointer = table_size + len(portraits)
+                pointers[portrait] = pointer
+                portraits += portrait
 
-            palette = parse_palette(kaomado)
-            sprite = decompress(kaomado)
+            pack_into('<L', table, 0xa0 * internal_id + 4 * sprite_num,
+                      pointer)
 
-            # The start/end of each sprite is word-aligned
-            word_offset = kaomado.tell() % 4
-            if word_offset:
-                kaomado.seek(4 - word_offset, os.SEEK_CUR)
+    with open(output_path + '.tmp', 'wb') as kaomado_file:
+        kaomado_file.write(table)
+        kaomado_file.write(portraits)
 
-            # Save image
-            sprite = unscramble(sprite, palette)
-            sprite = png.from_array(sprite, mode='RGB;5')
+    os.replace(output_path + '.tmp', output_path)
 
-            filename = build_filename(pokemon, expression, is_right, output_dir)
-            sprite.save(filename)
+    return copied, len(built)
 
-            sprite_num += 1
+def rip_atlas(kaomado, output_dir, group_by, jobs=1,
+              backend=DEFAULT_BACKEND):
+    """Rip portrait sprites into atlases, either one per Pokémon or one per
+    facial expression, along with an atlas.json index saying where each
+    portrait ended up.
 
+    Atlases are always truecolor, since every portrait has its own palette.
+    """
 
-def rip_sky(kaomado, output_dir):
-    """Rip portrait sprites from Explorers of Sky's kaomado.kao."""
+    sprites = list(kaomado.sprites())
+
+    # Only decode each distinct portrait once
+    digests = [kaomado.digest(offset) for pokemon_id, sprite_num, offset
+               in sprites]
+    unique_sprites = dict(zip(digests, sprites))
+    images = run_jobs(partial(unscramble_image, backend=backend), kaomado,
+                      unique_sprites.values(), jobs)
+    images = dict(zip(unique_sprites, images))
+
+    # Sort the portraits into atlases
+    atlases = {}
+    for (pokemon_id, sprite_num, offset), digest in zip(sprites, digests):
+        image = images[digest]
+        pokemon, expression, is_right = kaomado.describe(pokemon_id,
+                                                         sprite_num)
+
+        if group_by == ATLAS_POKEMON:
+            filename = build_filename(pokemon, tables.expressions.STANDARD,
+                                      False, '')
+        else:
+            filename = '{0}.png'.format(expression)
+
+        entry = {
+            'identifier': pokemon.identifier,
+            'is_female': pokemon.is_female,
+            'expression': expression,
+            'is_right': is_right,
+        }
+
+        atlases.setdefault(filename, []).append((entry, image))
+
+    index = {}
+    for filename, atlas_images in atlases.items():
+        # Use forward slashes in the index no matter what
+        key = filename.replace(os.sep, '/')
+        index[key] = build_atlas(atlas_images, output_dir, filename)
+
+    with open(os.path.join(output_dir, 'atlas.json'), 'w') as index_file:
+        json.dump(index, index_file, indent=1, sort_keys=True)
+
+def rip_blue(kaomado, output_dir, jobs=1, backend=DEFAULT_BACKEND,
+             mode=TRUECOLOR, atlas=None, incremental=False, duplicates=COPY,
+             profile=None, writers=DEFAULT_WRITERS,
+             queue_depth=DEFAULT_QUEUE_DEPTH):
+    """Rip portrait sprites from Blue Rescue Team's monster.sbin.  Or at least
+    the important ones.
+    """
+
+    if atlas is not None:
+        rip_atlas(kaomado, output_dir, atlas, jobs, backend)
+    else:
+        rip_portraits(kaomado, output_dir, jobs, backend, mode, incremental,
+                      duplicates, profile=profile, writers=writers,
+                      queue_depth=queue_depth)
+
+def rip_both(monster, kaomado, output_dir, jobs=1, backend=DEFAULT_BACKEND,
+             mode=TRUECOLOR, incremental=False, duplicates=COPY,
+             profile=None, writers=DEFAULT_WRITERS,
+             queue_depth=DEFAULT_QUEUE_DEPTH):
+    """Rip portrait sprites from both Explorers of Sky's kaomado.kao and Blue
+    Rescue Team's monster.sbin.
+
+    Sky's portraits go straight in the output directory (or sink).  Blue's
+    go in a red-blue subdirectory, but only the ones that don't come out
+    exactly the same as Sky's.
+
+    Given a profile, time both rips, with Blue's Pokémon grouped under
+    red-blue/ as well.
+    """
 
-    for internal_id, pokemon in tables.pokemon.sky.items():
-        kaomado.seek(0xa0 * internal_id)
+    sink = _sink(output_dir)
+    rip_portraits(kaomado, sink, jobs, backend, mode, incremental, duplicates,
+                  profile=profile, writers=writers, queue_depth=queue_depth)
 
-        # Each Pokémon has a sprite pointer for each facial expression and
-        # direction, even if they're not all used
-        pointers = unpack('<40L', kaomado.read(0xa0))
+    sky_sprites = portrait_filenames(kaomado)
+    blue_sprites = portrait_filenames(monster)
+    blue_sink = sink.subdirectory('red-blue')
+    blue_existing = blue_sink.plan(blue_sprites)
 
-        for sprite_num, pointer in enumerate(pointers):
-            if not 0x2d1e0 <= pointer <= 0x1968c0:
-                # Nonexistent sprites have consistent junk pointers, thankfully
-                continue
+    for filename, offset in list(blue_sprites.items()):
+        if filename not in sky_sprites:
+            continue
 
-            expression, is_right = tables.expressions.sky(pokemon, sprite_num)
+        sky_palette, sky_sprite, end = kaomado.decode(sky_sprites[filename])
+        blue_palette, blue_sprite, end = monster.decode(offset)
 
-            if expression is None:
-                # Some sprites exist, but are junk anyway
-                continue
+        if mode == INDEXED:
+            is_same = (sky_palette == blue_palette and
+                       untile(sky_sprite) == untile(blue_sprite))
+        else:
+            is_same = (unscramble(sky_sprite, sky_palette) ==
+                       unscramble(blue_sprite, blue_palette))
+
+        if is_same:
+            del blue_sprites[filename]
+
+            # Clean up after an earlier rip, when they might have differed
+            if filename in blue_existing:
+                blue_sink.remove(filename)
+
+    # Blue's PNGs and Pokémon would land in the same groups as Sky's, so
+    # they're timed separately and kept apart under red-blue/
+    blue_profile = None
+    if profile is not None:
+        blue_profile = Profile()
+
+    rip_portraits(monster, blue_sink, jobs, backend, mode, incremental,
+                  duplicates, blue_sprites, blue_profile, writers,
+                  queue_depth)
+
+    if profile is not None:
+        blue_profile.regroup({group: 'red-blue/' + group
+                              for group in blue_profile.groups})
+        profile.merge(blue_profile)
+
+def rip_portraits(kaomado, output_dir, jobs=1, backend=DEFAULT_BACKEND,
+                  mode=TRUECOLOR, incremental=False, duplicates=COPY,
+                  sprites=None, profile=None, writers=DEFAULT_WRITERS,
+                  queue_depth=DEFAULT_QUEUE_DEPTH):
+    """Rip every portrait sprite in a portrait file to its own PNG, or just
+    the ones in the given dict from portrait_filenames().  The output
+    directory can also be any OutputSink, e.g. an archive.
+
+    Identical portraits are only decoded and encoded once.  The first PNG for
+    each one is written as usual, and the rest are copied, linked, or listed
+    in aliases.json, depending on how duplicates should be handled.
+
+    An incremental rip keeps a manifest of where each PNG came from, and skips
+    any portrait that hasn't changed since the last incremental rip.  Only
+    directories can be ripped incrementally.
+
+    PNGs are written by a pool of writer threads while decoding carries on;
+    see WriteBehind.  If any write fails, an OSError is raised before any
+    duplicates, aliases, or manifest get written.  Aborting the sink then,
+    as leaving its with block does, cleans up after the rip: an archive is
+    never written at all, and a directory loses every PNG the rip created.
+    PNGs that were already there are replaced whole, so any the rip got to
+    keep their new contents, and the rest keep their old ones.
+
+    Given a profile, time each stage of the rip for each Pokémon.
+    """
+
+    sink = _sink(output_dir)
+
+    if incremental and not isinstance(sink, DirectorySink):
+        raise ValueError('only directories can be ripped incrementally')
+
+    if sprites is None:
+        sprites = portrait_filenames(kaomado)
+
+    existing = sink.plan(sprites)
+
+    # Hash every portrait; lots of pointers are shared, so only hash each
+    # pointer once
+    digests = {}
+    offset_digests = {}
+    for filename, offset in sprites.items():
+        if offset not in offset_digests:
+            offset_digests[offset] = kaomado.digest(offset)
+        digests[filename] = offset_digests[offset]
+
+    # The first PNG for each portrait gets ripped, and the others copy it
+    sources = {}
+    links = {}
+    for filename, digest in digests.items():
+        sources.setdefault(digest, filename)
+        if sources[digest] != filename:
+            links[filename] = sources[digest]
+
+    if incremental:
+        old_manifest = load_manifest(sink.path, mode, duplicates)
+        old_digests = old_manifest['files']
+        old_links = old_manifest['links']
+        old_pngs = old_manifest['pngs']
+
+        up_to_date = {
+            filename for filename in digests
+            if old_digests.get(filename) == digests[filename] and
+               old_links.get(filename) == links.get(filename) and
+               filename in existing
+        }
+    else:
+        up_to_date = set()
+
+    jobs_args = [
+        (filename, sprites[filename]) for filename in sprites
+        if filename not in links and filename not in up_to_date
+    ]
+
+    # Decoding (in worker processes, if there are any) never waits on the
+    # disk; PNGs come back here and are written behind it
+    encode = partial(_encode_sprite, backend=backend, mode=mode)
+    pngs = iter_jobs(encode, kaomado, jobs_args, jobs, profile)
+    png_digests = []
+
+    with WriteBehind(sink, writers, queue_depth, profile) as writer:
+        for (filename, offset), sprite in zip(jobs_args, pngs):
+            writer.write(filename, sprite)
+            png_digests.append(hashlib.sha1(sprite).hexdigest())
+
+    if duplicates == ALIAS:
+        aliases = json.dumps(links, indent=1, sort_keys=True)
+        sink.write(ALIASES, aliases.encode('UTF-8'))
+    else:
+        for filename, source in links.items():
+            if filename not in up_to_date:
+                if profile is not None:
+                    stopwatch = profile.stopwatch(filename)
+                else:
+                    stopwatch = _no_stopwatch
+
+                sink.link(source, filename, duplicates)
+                stopwatch.lap('write')
+
+    if profile is not None:
+        # Add up each Pokémon's PNGs
+        pokemon_groups = {}
+        for pokemon_id, sprite_num, offset in kaomado.sprites():
+            pokemon, expression, is_right = kaomado.describe(pokemon_id,
+                                                             sprite_num)
+            filename = _relative_filename(pokemon, expression, is_right)
+            pokemon_groups[filename] = pokemon.identifier
+
+            if pokemon.is_default_form:
+                filename = _relative_filename(pokemon._replace(form=None),
+                                              expression, is_right)
+                pokemon_groups[filename] = pokemon.identifier
+
+        profile.regroup(pokemon_groups)
+
+    if incremental:
+        pngs = {filename: old_pngs[filename] for filename in up_to_date
+                if filename in old_pngs}
+        pngs.update((filename, png_digest) for (filename, offset), png_digest
+                    in zip(jobs_args, png_digests))
+
+        if duplicates != ALIAS:
+            # Copies and links look just like the PNGs they came from
+            for filename, source in links.items():
+                if source in pngs:
+                    pngs[filename] = pngs[source]
+
+        # Only save the manifest once everything in it has actually been ripped
+        manifest = {
+            'mode': mode,
+            'duplicates': duplicates,
+            'files': digests,
+            'links': links,
+            'pngs': pngs,
+            'source': kaomado.file_digest(),
+        }
+
+        with open(os.path.join(sink.path, MANIFEST), 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+
+def rip_sky(kaomado, output_dir, jobs=1, backend=DEFAULT_BACKEND,
+            mode=TRUECOLOR, atlas=None, incremental=False, duplicates=COPY,
+            profile=None, writers=DEFAULT_WRITERS,
+            queue_depth=DEFAULT_QUEUE_DEPTH):
+    """Rip portrait sprites from Explorers of Sky's kaomado.kao."""
+
+    if atlas is not None:
+        rip_atlas(kaomado, output_dir, atlas, jobs, backend)
+    else:
+        rip_portraits(kaomado, output_dir, jobs, backend, mode, incremental,
+                      duplicates, profile=profile, writers=writers,
+                      queue_depth=queue_depth)
 
-            kaomado.seek(pointer)
+def run_jobs(function, kaomado, jobs_args, jobs=1, profile=None):
+    """Like iter_jobs(), but wait for every result and return them as a
+    list.
+    """
 
-            # Get the palette
-            palette = parse_palette(kaomado)
+    return list(iter_jobs(function, kaomado, jobs_args, jobs, profile))
 
-            # Extract the actual sprite
-            sprite = decompress(kaomado)
-            sprite = unscramble(sprite, palette)
+def tile(pixels):
+    """Tile untiled pixels, as from untile(), back into raw sprite data."""
 
-            # Save it as a PNG
-            sprite = png.from_array(sprite, mode='RGB;5')
-            filename = build_filename(pokemon, expression, is_right, output_dir)
-            sprite.save(filename)
+    pixels = _tile(pixels)
+    return bytes(low | high << 4 for low, high in zip(pixels[0::2],
+                                                       pixels[1::2]))
 
 def unscramble(sprite, palette):
     """Unscramble the raw sprite data into something pypng can swallow."""
 
-    pixels = pixel_iterator(sprite)
+    return apply_palette(untile(sprite), palette)
 
-    # Untile the sprite and apply the palette.  Each row is a flat list of RGB
-    # channels because, at the time of writing, image[y][x][channel] doesn't
-    # actually work with png.from_array().
-    image = [[None for x_channel in range(120)] for y in range(40)]
+def unscramble_image(kaomado, pokemon_id, sprite_num, offset,
+                     backend=DEFAULT_BACKEND):
+    """Decode and unscramble the sprite at the given offset.  Return the whole
+    image as flat RGB channels, row by row.
+    """
 
-    for tile in range(25):
-        tile_x = tile % 5
-        tile_y = tile // 5
+    palette, sprite, end = kaomado.decode(offset)
+    return b''.join(unscramble_rows(sprite, palette, backend))
 
-        for pixel in range(64):
-            pixel_x = pixel % 8
-            pixel_y = pixel // 8
+def unscramble_numpy(sprite, palette):
+    """Unscramble the raw sprite data with NumPy.  Return a 40×40×3 array of
+    RGB channels.
+    """
 
-            x = (tile_x * 8 + pixel_x) * 3
-            y = tile_y * 8 + pixel_y
+    numpy, untile_index = _numpy()
+
+    sprite = numpy.frombuffer(sprite, dtype=numpy.uint8, count=800)
+
+    pixels = numpy.empty(1600, dtype=numpy.uint8)
+    pixels[0::2] = sprite & 0xf
+    pixels[1::2] = sprite >> 4
+
+    palette = numpy.array(palette, dtype=numpy.uint8)
+    return palette[pixels[untile_index]].reshape(40, 40, 3)
 
-            image[y][x:x + 3] = palette[next(pixels)]
+def unscramble_rows(sprite, palette, backend=DEFAULT_BACKEND):
+    """Unscramble the raw sprite data with the given backend.  Whichever
+    backend is used, return rows of flat RGB channels like unscramble() does.
+    """
+
+    if backend == NUMPY:
+        # pypng is much happier with plain bytes than with NumPy rows
+        image = unscramble_numpy(sprite, palette).tobytes()
+        return [image[y:y + 120] for y in range(0, 4800, 120)]
+    else:
+        return unscramble(sprite, palette)
 
-    return image
+def untile(sprite):
+    """Untile the raw sprite data.  Return a palette index for each pixel,
+    row by row.
+    """
 
+    sprite = bytes(sprite[:800])
+
+    pixels = bytearray(1600)
+    pixels[0::2] = sprite.translate(_low_nybbles)
+    pixels[1::2] = sprite.translate(_high_nybbles)
+
+    return bytes(_untile(pixels))
+
+
+def main(argv=None):
+    import argparse
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(
+        description='Extract portrait sprites from PMD: Explorers of Sky or '
+                    'PMD: Blue Rescue Team.'
+    )
+    commands = parser.add_subparsers(dest='command')
+
+    # Options for every command
+    common_options = argparse.ArgumentParser(add_help=False)
+    common_options.add_argument('--table-cache', metavar='FILE',
+                                help='cache the expression tables in FILE, '
+                                     'instead of building them every time')
+
+    # Options for every kind of rip
+    rip_options = argparse.ArgumentParser(add_help=False,
+                                          parents=[common_options])
+    rip_options.add_argument('-j', '--jobs', type=int, default=1,
+                             help='number of worker processes to rip with (0 '
+                                  'for one per CPU)')
+    rip_options.add_argument('--backend', choices=BACKENDS,
+                             default=DEFAULT_BACKEND,
+                             help='how to unscramble sprites (default: '
+                                  '%(default)s)')
+    rip_options.add_argument('--mode', choices=MODES, default=TRUECOLOR,
+                             help='write 5-bit RGB PNGs, or 4-bit PNGs '
+                                  "indexed with each sprite's palette "
+                                  '(default: %(default)s)')
+    rip_options.add_argument('--output-format', choices=OUTPUTS,
+                             default=DIRECTORY,
+                             help='write PNGs to a directory, or straight '
+                                  'into a zip (deflated or stored) or tar '
+                                  'file at output-dir (default: %(default)s)')
+    rip_options.add_argument('--writers', type=int, default=DEFAULT_WRITERS,
+                             help='number of threads writing PNGs out while '
+                                  'ripping; archives always get one '
+                                  '(default: %(default)s)')
+    rip_options.add_argument('--queue-depth', type=int,
+                             default=DEFAULT_QUEUE_DEPTH,
+                             help='number of PNGs that can wait to be written '
+                                  'before decoding waits too (default: '
+                                  '%(default)s)')
+    rip_options.add_argument('--incremental', action='store_true',
+                             help="keep a manifest of what's been ripped, and "
+                                  "skip portraits that haven't changed since "
+                                  "last time")
+    rip_options.add_argument('--duplicates', choices=DUPLICATES, default=COPY,
+                             help='how to write out portraits identical to '
+                                  "one that's already been ripped (default: "
+                                  '%(default)s)')
+    rip_options.add_argument('--profile', action='store_true',
+                             help='time each stage of the rip and print a '
+                                  'breakdown')
+    rip_options.add_argument('--profile-json', metavar='FILE',
+                             help='time each stage of the rip and save the '
+                                  'breakdown as JSON')
+
+    rip_parser = commands.add_parser(
+        'rip', parents=[rip_options],
+        help='rip one portrait file (the default command)'
+    )
+    rip_parser.add_argument('portrait_file', metavar='portrait-file',
+                            help='kaomado.kao (Sky) or monster.sbin (Blue)')
+    rip_parser.add_argument('output_dir', metavar='output-dir', nargs='?')
+    rip_parser.add_argument('--atlas', choices=ATLASES,
+                            help='pack portraits into one atlas per Pokémon '
+                                 'or per expression, indexed by atlas.json')
+    rip_parser.add_argument('--check-backends', action='store_true',
+                            help="instead of ripping, check that every "
+                                 "backend unscrambles every sprite the same "
+                                 "way")
+    rip_parser.set_defaults(command=command_rip)
+
+    both_parser = commands.add_parser(
+        'both', parents=[rip_options],
+        help="rip both games' portraits, keeping only the Blue ones that "
+             "differ from Sky's"
+    )
+    both_parser.add_argument('monster_file', metavar='monster.sbin')
+    both_parser.add_argument('kaomado_file', metavar='kaomado.kao')
+    both_parser.add_argument('output_dir', metavar='output-dir')
+    both_parser.set_defaults(command=command_both)
+
+    serve_parser = commands.add_parser(
+        'serve', parents=[common_options], help='serve portraits over HTTP'
+    )
+    serve_parser.add_argument('portrait_files', metavar='portrait-file',
+                              nargs='+',
+                              help='kaomado.kao (Sky) and/or monster.sbin '
+                                   '(Blue)')
+    serve_parser.add_argument('--host', default='127.0.0.1',
+                              help='address to listen on (default: '
+                                   '%(default)s)')
+    serve_parser.add_argument('--port', type=int, default=8000,
+                              help='port to listen on (default: %(default)s)')
+    serve_parser.add_argument('--mode', choices=MODES, default=TRUECOLOR,
+                              help='serve 5-bit RGB PNGs or 4-bit indexed '
+                                   'PNGs (default: %(default)s)')
+    serve_parser.add_argument('--threads', type=int,
+                              help='number of threads to decode portraits '
+                                   'with (default: decided by Python)')
+    serve_parser.add_argument('--cache-size', type=int, default=1024,
+                              help='number of decoded portraits and PNGs to '
+                                   'keep around (default: %(default)s)')
+    serve_parser.set_defaults(command=command_serve)
+
+    rebuild_parser = commands.add_parser(
+        'rebuild', parents=[common_options],
+        help="rebuild Sky's kaomado.kao from a directory of PNGs"
+    )
+    rebuild_parser.add_argument('input_dir', metavar='input-dir',
+                                help='PNGs laid out like a Sky rip')
+    rebuild_parser.add_argument('output_file', metavar='output-file',
+                                help='where to write the new kaomado.kao')
+    rebuild_parser.add_argument('--base', metavar='kaomado.kao',
+                                help='the kaomado.kao the PNGs were ripped '
+                                     'from; portraits that haven\'t been '
+                                     'edited are copied from it as-is, and '
+                                     'so are any with no PNG')
+    rebuild_parser.add_argument('--effort', type=int, default=6,
+                                choices=range(10), metavar='0-9',
+                                help='how hard to try to compress portraits '
+                                     '(default: %(default)s)')
+    rebuild_parser.set_defaults(command=command_rebuild)
+
+    # Ripping a single file doesn't need to be spelled out
+    if argv and argv[0] not in commands.choices and \
+            argv[0] not in ['-h', '--help']:
+        argv = ['rip'] + argv
+
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        parser.error('a command is required')
+    if 'jobs' in args and args.jobs < 0:
+        parser.error('--jobs must be positive')
+    if ('output_format' in args and args.output_format != DIRECTORY and
+            args.incremental):
+        parser.error("archives can't be ripped incrementally")
+    if 'writers' in args and args.writers < 1:
+        parser.error('--writers must be positive')
+    if 'queue_depth' in args and args.queue_depth < 1:
+        parser.error('--queue-depth must be positive')
+
+    tables.expressions.cache_path = args.table_cache
+
+    args.command(parser, args)
+
+def command_both(parser, args):
+    """Rip both games' portrait files, like rip.sh."""
+
+    jobs = args.jobs or os.cpu_count()
 
-if len(argv) != 3:
-    print("Usage: kaomado.py portrait-file output-dir")
-    exit(1)
+    try:
+        monster = open_portrait_file(args.monster_file)
+        kaomado = open_portrait_file(args.kaomado_file)
+    except ValueError:
+        print("Unrecognized portrait file")
+        exit(1)
 
-kaomado = open(argv[1], 'rb')
-output_dir = argv[2]
+    if monster.version != BLUE or kaomado.version != SKY:
+        print("Expected monster.sbin from Blue and kaomado.kao from Sky")
+        exit(1)
 
-magic = kaomado.read(5)
+    profile = _start_profile(args)
 
-if magic == b'\x00\x00\x00\x00\x00':
-    version = SKY
-    rip = rip_sky
-elif magic == b'ax001':
-    version = BLUE
-    rip = rip_blue
-else:
-    print("Unrecognized portrait file")
-    exit(1)
+    try:
+        with monster, kaomado, open_sink(args.output_dir,
+                                         args.output_format) as sink:
+            rip_both(monster, kaomado, sink, jobs, args.backend, args.mode,
+                     args.incremental, args.duplicates, profile, args.writers,
+                     args.queue_depth)
+    except OSError as error:
+        print(error)
+        exit(1)
+
+    _finish_profile(args, profile)
+
+def command_rebuild(parser, args):
+    """Rebuild kaomado.kao from PNGs."""
+
+    base = None
+    if args.base is not None:
+        try:
+            base = open_portrait_file(args.base)
+        except ValueError:
+            print("Unrecognized portrait file")
+            exit(1)
+
+        if base.version != SKY:
+            # monster.sbin's blocks aren't understood well enough to rebuild
+            print("Only Sky's kaomado.kao can be rebuilt")
+            exit(1)
+
+    try:
+        copied, compressed = rebuild_sky(args.input_dir, args.output_file,
+                                         base, args.effort)
+    except ValueError as error:
+        print(error)
+        exit(1)
+    finally:
+        if base is not None:
+            base.close()
+
+    print("Copied {0} portraits as-is and compressed {1} from PNGs".format(
+        copied, compressed))
+
+def command_rip(parser, args):
+    """Rip a single portrait file."""
+
+    if args.output_dir is None and not args.check_backends:
+        parser.error('an output directory is required')
+    if args.atlas is not None and args.mode == INDEXED:
+        parser.error('atlases are always truecolor')
+    if args.atlas is not None and args.incremental:
+        parser.error("atlases can't be ripped incrementally")
+    if args.atlas is not None and (args.profile or args.profile_json):
+        parser.error("atlases can't be profiled")
+    if args.atlas is not None and args.output_format != DIRECTORY:
+        parser.error('atlases are always written to a directory')
+
+    jobs = args.jobs or os.cpu_count()
+
+    try:
+        kaomado = open_portrait_file(args.portrait_file)
+    except ValueError:
+        print("Unrecognized portrait file")
+        exit(1)
+
+    if args.check_backends:
+        with kaomado:
+            sprite_count = check_backends(kaomado)
+
+        print("{0} sprites match across backends: {1}".format(
+            sprite_count, ', '.join(BACKENDS)))
+        return
+
+    output_dir = args.output_dir
+
+    if kaomado.version == SKY:
+        rip = rip_sky
+    else:
+        rip = rip_blue
+
+    # Portrait rips plan out their own directories
+    if args.atlas is not None:
+        makedirs_if_need_be(output_dir)
+
+    profile = _start_profile(args)
+
+    try:
+        with kaomado, open_sink(output_dir, args.output_format) as sink:
+            rip(kaomado, sink if args.atlas is None else output_dir, jobs,
+                args.backend, args.mode, args.atlas, args.incremental,
+                args.duplicates, profile, args.writers, args.queue_depth)
+    except OSError as error:
+        print(error)
+        exit(1)
+
+    _finish_profile(args, profile)
+
+def command_serve(parser, args):
+    """Serve portraits over HTTP until interrupted."""
+
+    if args.threads is not None and args.threads < 1:
+        parser.error('--threads must be positive')
+    if args.cache_size < 1:
+        parser.error('--cache-size must be positive')
+
+    kaomados = []
+
+    for portrait_file in args.portrait_files:
+        try:
+            kaomados.append(open_portrait_file(portrait_file))
+        except ValueError:
+            print("Unrecognized portrait file")
+            exit(1)
+
+    if len({kaomado.version for kaomado in kaomados}) != len(kaomados):
+        parser.error('only one portrait file per game, please')
+
+    cache = PortraitCache(args.cache_size, max_pngs=args.cache_size)
+    server = PortraitServer(kaomados, args.mode, cache, args.threads)
+
+    print("Serving {0} on http://{1}:{2}/".format(
+        ' and '.join(kaomado.version for kaomado in kaomados), args.host,
+        args.port))
+
+    import asyncio
+
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.executor.shutdown()
+        for kaomado in kaomados:
+            kaomado.close()
+
+def _finish_profile(args, profile):
+    """Print and/or save a profile from _start_profile()."""
+
+    if profile is None:
+        return
+
+    wall_time = time.perf_counter() - args.profile_start
+
+    if args.profile:
+        print(profile.format(wall_time))
+
+    if args.profile_json is not None:
+        with open(args.profile_json, 'w') as profile_file:
+            json.dump(profile.report(wall_time), profile_file, indent=1,
+                      sort_keys=True)
+
+def _start_profile(args):
+    """Start profiling a rip, if asked to.  Return the profile, or None."""
+
+    if not args.profile and args.profile_json is None:
+        return None
 
-# Make the leaves of the required directory tree (parents are taken care of)
-makedirs_if_need_be(os.path.join(output_dir, 'right'))
-if version == SKY:
-    makedirs_if_need_be(os.path.join(output_dir, 'female', 'right'))
+    args.profile_start = time.perf_counter()
+    return Profile()
 
-rip(kaomado, output_dir)
+if __name__ == '__main__':
+    main()
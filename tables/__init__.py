@@ -1,2 +1,10 @@
-from tables import pokemon
-from tables import expressions
+import importlib
+
+def __getattr__(name):
+    """Import each table the first time it's needed."""
+
+    if name in ('pokemon', 'expressions'):
+        return importlib.import_module('tables.' + name)
+
+    raise AttributeError(
+        "module {0!r} has no attribute {1!r}".format(__name__, name))
@@ -1,3 +1,11 @@
+import hashlib
+import json
+import os
+
+import tables.pokemon
+
+_here = os.path.dirname(os.path.abspath(__file__))
+
 ### Expression constants to minimize typos and keep everything organized
 # Expressions with "official" names from the Sky debug menu
 ANGRY = 'angry'
@@ -304,3 +312,180 @@ def blue(pokemon, sprite_num):
         return _blue_special_cases[key]
     else:
         return (_blue_default[sprite_num], False)
+
+# Both functions above are resolved ahead of time into dense tables, one per
+# game: a list indexed by Pokémon ID, holding a tuple indexed by sprite
+# number.  Each entry is the (expression, is_right) the function returns, or
+# None where the function has no answer at all and raises; a real sprite
+# there is an error, not junk.  IDs with no Pokémon are None altogether.
+# The tables are built the first time they're needed.  If cache_path is set
+# by then, they're also cached there as JSON, keyed on this module and the
+# Pokémon table's source, and checked against the functions when saved.
+
+cache_path = None
+
+_sprite_counts = {'sky': 40, 'blue': len(_blue_default)}
+_functions = {'sky': sky, 'blue': blue}
+
+def _source_digest():
+    """Hash the source of everything the tables are built from."""
+
+    digest = hashlib.sha1()
+
+    for module in ('expressions', 'pokemon'):
+        with open(os.path.join(_here, module + '.py'), 'rb') as source:
+            digest.update(source.read())
+
+    return digest.hexdigest()
+
+def build_table(version):
+    """Build the expression table for 'sky' or 'blue' from scratch."""
+
+    function = _functions[version]
+    pokemon_table = getattr(tables.pokemon, version)
+    table = [None] * (max(pokemon_table) + 1)
+
+    for pokemon_id, pokemon in pokemon_table.items():
+        sprites = []
+
+        for sprite_num in range(_sprite_counts[version]):
+            try:
+                sprites.append(function(pokemon, sprite_num))
+            except (KeyError, IndexError):
+                # Not a sprite number this Pokémon should ever use
+                sprites.append(None)
+
+        table[pokemon_id] = tuple(sprites)
+
+    return table
+
+def validate_table(version, table):
+    """Check every entry in an expression table against sky() or blue().
+    Raise ValueError if any of them disagree.
+    """
+
+    function = _functions[version]
+    pokemon_table = getattr(tables.pokemon, version)
+
+    for pokemon_id in range(len(table)):
+        pokemon = pokemon_table.get(pokemon_id)
+
+        if pokemon is None:
+            if table[pokemon_id] is not None:
+                raise ValueError('{0} table has sprites for nonexistent '
+                                 'Pokémon #{1}'.format(version, pokemon_id))
+
+            continue
+
+        for sprite_num in range(_sprite_counts[version]):
+            entry = table[pokemon_id][sprite_num]
+
+            try:
+                matches = entry == function(pokemon, sprite_num)
+            except (KeyError, IndexError):
+                matches = entry is None
+
+            if not matches:
+                raise ValueError('{0} table is wrong for Pokémon #{1}, sprite '
+                                 '{2}'.format(version, pokemon_id, sprite_num))
+
+def _to_json(built):
+    """Pack both tables for JSON.  Each distinct (expression, is_right) entry
+    is stored once, and the tables store its index, or -1 for None.
+    """
+
+    entries = sorted({entry for table in built.values()
+                      for sprites in table if sprites is not None
+                      for entry in sprites if entry is not None},
+                     key=repr)
+    numbers = {entry: number for number, entry in enumerate(entries)}
+    numbers[None] = -1
+
+    packed = {
+        version: [None if sprites is None else
+                  [numbers[entry] for entry in sprites] for sprites in table]
+        for version, table in built.items()
+    }
+
+    return {'entries': entries, 'tables': packed}
+
+def _from_json(cached):
+    """Unpack both tables after a trip through JSON."""
+
+    entries = [tuple(entry) for entry in cached['entries']]
+    entries.append(None)  # So that -1 means None
+
+    return {
+        version: [None if sprites is None else
+                  tuple([entries[number] for number in sprites])
+                  for sprites in table]
+        for version, table in cached['tables'].items()
+    }
+
+def _load_tables(cache_path, digest):
+    """Load both tables from the cache, or return None if it's missing or
+    stale.
+    """
+
+    try:
+        with open(cache_path) as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+    if cache.get('digest') != digest:
+        return None
+
+    return _from_json(cache)
+
+def _save_tables(cache_path, digest, cached):
+    """Cache both tables, if we can."""
+
+    try:
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        # Write then rename, so a concurrent reader never sees half a file
+        temp_path = '{0}.{1}'.format(cache_path, os.getpid())
+        with open(temp_path, 'w') as cache_file:
+            json.dump(dict(cached, digest=digest), cache_file)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        pass
+
+def __getattr__(name):
+    """Build sky_table or blue_table the first time it's needed.  With a
+    cache, both are loaded or built and saved together instead.
+    """
+
+    if name not in ('sky_table', 'blue_table'):
+        raise AttributeError(
+            "module {0!r} has no attribute {1!r}".format(__name__, name))
+
+    if cache_path is None:
+        version = name[:-len('_table')]
+        table = build_table(version)
+        globals()[name] = table
+        return table
+
+    digest = _source_digest()
+    loaded = _load_tables(cache_path, digest)
+
+    if loaded is None:
+        # Check the tables exactly as they'll come back out of the cache, once,
+        # so that loading them can go by the digest alone
+        packed = _to_json({version: build_table(version)
+                           for version in _functions})
+        loaded = _from_json(json.loads(json.dumps(packed)))
+
+        for version, table in loaded.items():
+            validate_table(version, table)
+
+        _save_tables(cache_path, digest, packed)
+
+    module = globals()
+    module['sky_table'] = loaded['sky']
+    module['blue_table'] = loaded['blue']
+
+    return module[name]
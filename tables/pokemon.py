@@ -1,624 +1,684 @@
 from collections import namedtuple
+import sys
 
 # female is true iff the sprite is a SEPARATE female sprite
 # e.g. True for female Rattata, false for Latias
 Pokemon = namedtuple('Pokemon', 'national_id species form is_female')
 
 class Pokemon(Pokemon):
+    # No __dict__; there are hundreds of these in every worker process
+    __slots__ = ()
+
     @property
     def identifier(self):
-        if not hasattr(self, '_identifier'):
-            if self.form is not None:
-                self._identifier = '{0}-{1}'.format(self.national_id, self.form)
-            else:
-                self._identifier = str(self.national_id)
+        # Worked out once per Pokémon, since it's asked for for every sprite
+        try:
+            return _identifiers[self]
+        except KeyError:
+            pass
+
+        if self.form is not None:
+            identifier = '{0}-{1}'.format(self.national_id, self.form)
+        else:
+            identifier = str(self.national_id)
+
+        _identifiers[self] = identifier
+        return identifier
+
+    @property
+    def is_default_form(self):
+        return (self.national_id, self.form) in default_forms
 
-        return self._identifier
+_identifiers = {}
 
-sky = {
-    1: Pokemon(1, 'bulbasaur', None, False),
-    2: Pokemon(2, 'ivysaur', None, False),
-    3: Pokemon(3, 'venusaur', None, False),
-    4: Pokemon(4, 'charmander', None, False),
-    5: Pokemon(5, 'charmeleon', None, False),
-    6: Pokemon(6, 'charizard', None, False),
-    7: Pokemon(7, 'squirtle', None, False),
-    8: Pokemon(8, 'wartortle', None, False),
-    9: Pokemon(9, 'blastoise', None, False),
-    10: Pokemon(10, 'caterpie', None, False),
-    11: Pokemon(11, 'metapod', None, False),
-    12: Pokemon(12, 'butterfree', None, False),
-    13: Pokemon(13, 'weedle', None, False),
-    14: Pokemon(14, 'kakuna', None, False),
-    15: Pokemon(15, 'beedrill', None, False),
-    16: Pokemon(16, 'pidgey', None, False),
-    17: Pokemon(17, 'pidgeotto', None, False),
-    18: Pokemon(18, 'pidgeot', None, False),
-    19: Pokemon(19, 'rattata', None, False),
-    20: Pokemon(20, 'raticate', None, False),
-    21: Pokemon(21, 'spearow', None, False),
-    22: Pokemon(22, 'fearow', None, False),
-    23: Pokemon(23, 'ekans', None, False),
-    24: Pokemon(24, 'arbok', None, False),
-    25: Pokemon(25, 'pikachu', None, False),
-    26: Pokemon(26, 'raichu', None, False),
-    27: Pokemon(27, 'sandshrew', None, False),
-    28: Pokemon(28, 'sandslash', None, False),
-    29: Pokemon(29, 'nidoran-f', None, False),
-    30: Pokemon(30, 'nidorina', None, False),
-    31: Pokemon(31, 'nidoqueen', None, False),
-    32: Pokemon(32, 'nidoran-m', None, False),
-    33: Pokemon(33, 'nidorino', None, False),
-    34: Pokemon(34, 'nidoking', None, False),
-    35: Pokemon(35, 'clefairy', None, False),
-    36: Pokemon(36, 'clefable', None, False),
-    37: Pokemon(37, 'vulpix', None, False),
-    38: Pokemon(38, 'ninetales', None, False),
-    39: Pokemon(39, 'jigglypuff', None, False),
-    40: Pokemon(40, 'wigglytuff', None, False),
-    41: Pokemon(41, 'zubat', None, False),
-    42: Pokemon(42, 'golbat', None, False),
-    43: Pokemon(43, 'oddish', None, False),
-    44: Pokemon(44, 'gloom', None, False),
-    45: Pokemon(45, 'vileplume', None, False),
-    46: Pokemon(46, 'paras', None, False),
-    47: Pokemon(47, 'parasect', None, False),
-    48: Pokemon(48, 'venonat', None, False),
-    49: Pokemon(49, 'venomoth', None, False),
-    50: Pokemon(50, 'diglett', None, False),
-    51: Pokemon(51, 'dugtrio', None, False),
-    52: Pokemon(52, 'meowth', None, False),
-    53: Pokemon(53, 'persian', None, False),
-    54: Pokemon(54, 'psyduck', None, False),
-    55: Pokemon(55, 'golduck', None, False),
-    56: Pokemon(56, 'mankey', None, False),
-    57: Pokemon(57, 'primeape', None, False),
-    58: Pokemon(58, 'growlithe', None, False),
-    59: Pokemon(59, 'arcanine', None, False),
-    60: Pokemon(60, 'poliwag', None, False),
-    61: Pokemon(61, 'poliwhirl', None, False),
-    62: Pokemon(62, 'poliwrath', None, False),
-    63: Pokemon(63, 'abra', None, False),
-    64: Pokemon(64, 'kadabra', None, False),
-    65: Pokemon(65, 'alakazam', None, False),
-    66: Pokemon(66, 'machop', None, False),
-    67: Pokemon(67, 'machoke', None, False),
-    68: Pokemon(68, 'machamp', None, False),
-    69: Pokemon(69, 'bellsprout', None, False),
-    70: Pokemon(70, 'weepinbell', None, False),
-    71: Pokemon(71, 'victreebel', None, False),
-    72: Pokemon(72, 'tentacool', None, False),
-    73: Pokemon(73, 'tentacruel', None, False),
-    74: Pokemon(74, 'geodude', None, False),
-    75: Pokemon(75, 'graveler', None, False),
-    76: Pokemon(76, 'golem', None, False),
-    77: Pokemon(77, 'ponyta', None, False),
-    78: Pokemon(78, 'rapidash', None, False),
-    79: Pokemon(79, 'slowpoke', None, False),
-    80: Pokemon(80, 'slowbro', None, False),
-    81: Pokemon(81, 'magnemite', None, False),
-    82: Pokemon(82, 'magneton', None, False),
-    83: Pokemon(83, 'farfetchd', None, False),
-    84: Pokemon(84, 'doduo', None, False),
-    85: Pokemon(85, 'dodrio', None, False),
-    86: Pokemon(86, 'seel', None, False),
-    87: Pokemon(87, 'dewgong', None, False),
-    88: Pokemon(88, 'grimer', None, False),
-    89: Pokemon(89, 'muk', None, False),
-    90: Pokemon(90, 'shellder', None, False),
-    91: Pokemon(91, 'cloyster', None, False),
-    92: Pokemon(92, 'gastly', None, False),
-    93: Pokemon(93, 'haunter', None, False),
-    94: Pokemon(94, 'gengar', None, False),
-    95: Pokemon(95, 'onix', None, False),
-    96: Pokemon(96, 'drowzee', None, False),
-    97: Pokemon(97, 'hypno', None, False),
-    98: Pokemon(98, 'krabby', None, False),
-    99: Pokemon(99, 'kingler', None, False),
-    100: Pokemon(100, 'voltorb', None, False),
-    101: Pokemon(101, 'electrode', None, False),
-    102: Pokemon(102, 'exeggcute', None, False),
-    103: Pokemon(103, 'exeggutor', None, False),
-    104: Pokemon(104, 'cubone', None, False),
-    105: Pokemon(105, 'marowak', None, False),
-    106: Pokemon(106, 'hitmonlee', None, False),
-    107: Pokemon(107, 'hitmonchan', None, False),
-    108: Pokemon(108, 'lickitung', None, False),
-    109: Pokemon(109, 'koffing', None, False),
-    110: Pokemon(110, 'weezing', None, False),
-    111: Pokemon(111, 'rhyhorn', None, False),
-    112: Pokemon(112, 'rhydon', None, False),
-    113: Pokemon(113, 'chansey', None, False),
-    114: Pokemon(114, 'tangela', None, False),
-    115: Pokemon(115, 'kangaskhan', None, False),
-    116: Pokemon(116, 'horsea', None, False),
-    117: Pokemon(117, 'seadra', None, False),
-    118: Pokemon(118, 'goldeen', None, False),
-    119: Pokemon(119, 'seaking', None, False),
-    120: Pokemon(120, 'staryu', None, False),
-    121: Pokemon(121, 'starmie', None, False),
-    122: Pokemon(122, 'mr-mime', None, False),
-    123: Pokemon(123, 'scyther', None, False),
-    124: Pokemon(124, 'jynx', None, False),
-    125: Pokemon(125, 'electabuzz', None, False),
-    126: Pokemon(126, 'magmar', None, False),
-    127: Pokemon(127, 'pinsir', None, False),
-    128: Pokemon(128, 'tauros', None, False),
-    129: Pokemon(129, 'magikarp', None, False),
-    130: Pokemon(130, 'gyarados', None, False),
-    131: Pokemon(131, 'lapras', None, False),
-    132: Pokemon(132, 'ditto', None, False),
-    133: Pokemon(133, 'eevee', None, False),
-    134: Pokemon(134, 'vaporeon', None, False),
-    135: Pokemon(135, 'jolteon', None, False),
-    136: Pokemon(136, 'flareon', None, False),
-    137: Pokemon(137, 'porygon', None, False),
-    138: Pokemon(138, 'omanyte', None, False),
-    139: Pokemon(139, 'omastar', None, False),
-    140: Pokemon(140, 'kabuto', None, False),
-    141: Pokemon(141, 'kabutops', None, False),
-    142: Pokemon(142, 'aerodactyl', None, False),
-    143: Pokemon(143, 'snorlax', None, False),
-    144: Pokemon(144, 'articuno', None, False),
-    145: Pokemon(145, 'zapdos', None, False),
-    146: Pokemon(146, 'moltres', None, False),
-    147: Pokemon(147, 'dratini', None, False),
-    148: Pokemon(148, 'dragonair', None, False),
-    149: Pokemon(149, 'dragonite', None, False),
-    150: Pokemon(150, 'mewtwo', None, False),
-    151: Pokemon(151, 'mew', None, False),
-    152: Pokemon(152, 'chikorita', None, False),
-    153: Pokemon(153, 'bayleef', None, False),
-    154: Pokemon(154, 'meganium', None, False),
-    155: Pokemon(155, 'cyndaquil', None, False),
-    156: Pokemon(156, 'quilava', None, False),
-    157: Pokemon(157, 'typhlosion', None, False),
-    158: Pokemon(158, 'totodile', None, False),
-    159: Pokemon(159, 'croconaw', None, False),
-    160: Pokemon(160, 'feraligatr', None, False),
-    161: Pokemon(161, 'sentret', None, False),
-    162: Pokemon(162, 'furret', None, False),
-    163: Pokemon(163, 'hoothoot', None, False),
-    164: Pokemon(164, 'noctowl', None, False),
-    165: Pokemon(165, 'ledyba', None, False),
-    166: Pokemon(166, 'ledian', None, False),
-    167: Pokemon(167, 'spinarak', None, False),
-    168: Pokemon(168, 'ariados', None, False),
-    169: Pokemon(169, 'crobat', None, False),
-    170: Pokemon(170, 'chinchou', None, False),
-    171: Pokemon(171, 'lanturn', None, False),
-    172: Pokemon(172, 'pichu', None, False),
-    173: Pokemon(173, 'cleffa', None, False),
-    174: Pokemon(174, 'igglybuff', None, False),
-    175: Pokemon(175, 'togepi', None, False),
-    176: Pokemon(176, 'togetic', None, False),
-    177: Pokemon(177, 'natu', None, False),
-    178: Pokemon(178, 'xatu', None, False),
-    179: Pokemon(179, 'mareep', None, False),
-    180: Pokemon(180, 'flaaffy', None, False),
-    181: Pokemon(181, 'ampharos', None, False),
-    182: Pokemon(182, 'bellossom', None, False),
-    183: Pokemon(183, 'marill', None, False),
-    184: Pokemon(184, 'azumarill', None, False),
-    185: Pokemon(185, 'sudowoodo', None, False),
-    186: Pokemon(186, 'politoed', None, False),
-    187: Pokemon(187, 'hoppip', None, False),
-    188: Pokemon(188, 'skiploom', None, False),
-    189: Pokemon(189, 'jumpluff', None, False),
-    190: Pokemon(190, 'aipom', None, False),
-    191: Pokemon(191, 'sunkern', None, False),
-    192: Pokemon(192, 'sunflora', None, False),
-    193: Pokemon(193, 'yanma', None, False),
-    194: Pokemon(194, 'wooper', None, False),
-    195: Pokemon(195, 'quagsire', None, False),
-    196: Pokemon(196, 'espeon', None, False),
-    197: Pokemon(197, 'umbreon', None, False),
-    198: Pokemon(198, 'murkrow', None, False),
-    199: Pokemon(199, 'slowking', None, False),
-    200: Pokemon(200, 'misdreavus', None, False),
-    201: Pokemon(201, 'unown', 'a', False),
-    202: Pokemon(201, 'unown', 'b', False),
-    203: Pokemon(201, 'unown', 'c', False),
-    204: Pokemon(201, 'unown', 'd', False),
-    205: Pokemon(201, 'unown', 'e', False),
-    206: Pokemon(201, 'unown', 'f', False),
-    207: Pokemon(201, 'unown', 'g', False),
-    208: Pokemon(201, 'unown', 'h', False),
-    209: Pokemon(201, 'unown', 'i', False),
-    210: Pokemon(201, 'unown', 'j', False),
-    211: Pokemon(201, 'unown', 'k', False),
-    212: Pokemon(201, 'unown', 'l', False),
-    213: Pokemon(201, 'unown', 'm', False),
-    214: Pokemon(201, 'unown', 'n', False),
-    215: Pokemon(201, 'unown', 'o', False),
-    216: Pokemon(201, 'unown', 'p', False),
-    217: Pokemon(201, 'unown', 'q', False),
-    218: Pokemon(201, 'unown', 'r', False),
-    219: Pokemon(201, 'unown', 's', False),
-    220: Pokemon(201, 'unown', 't', False),
-    221: Pokemon(201, 'unown', 'u', False),
-    222: Pokemon(201, 'unown', 'v', False),
-    223: Pokemon(201, 'unown', 'w', False),
-    224: Pokemon(201, 'unown', 'x', False),
-    225: Pokemon(201, 'unown', 'y', False),
-    226: Pokemon(201, 'unown', 'z', False),
-    227: Pokemon(201, 'unown', 'exclamation', False),
-    228: Pokemon(201, 'unown', 'question', False),
-    229: Pokemon(202, 'wobbuffet', None, False),
-    230: Pokemon(203, 'girafarig', None, False),
-    231: Pokemon(204, 'pineco', None, False),
-    232: Pokemon(205, 'forretress', None, False),
-    233: Pokemon(206, 'dunsparce', None, False),
-    234: Pokemon(207, 'gligar', None, False),
-    235: Pokemon(208, 'steelix', None, False),
-    236: Pokemon(209, 'snubbull', None, False),
-    237: Pokemon(210, 'granbull', None, False),
-    238: Pokemon(211, 'qwilfish', None, False),
-    239: Pokemon(212, 'scizor', None, False),
-    240: Pokemon(213, 'shuckle', None, False),
-    241: Pokemon(214, 'heracross', None, False),
-    242: Pokemon(215, 'sneasel', None, False),
-    243: Pokemon(216, 'teddiursa', None, False),
-    244: Pokemon(217, 'ursaring', None, False),
-    245: Pokemon(218, 'slugma', None, False),
-    246: Pokemon(219, 'magcargo', None, False),
-    247: Pokemon(220, 'swinub', None, False),
-    248: Pokemon(221, 'piloswine', None, False),
-    249: Pokemon(222, 'corsola', None, False),
-    250: Pokemon(223, 'remoraid', None, False),
-    251: Pokemon(224, 'octillery', None, False),
-    252: Pokemon(225, 'delibird', None, False),
-    253: Pokemon(226, 'mantine', None, False),
-    254: Pokemon(227, 'skarmory', None, False),
-    255: Pokemon(228, 'houndour', None, False),
-    256: Pokemon(229, 'houndoom', None, False),
-    257: Pokemon(230, 'kingdra', None, False),
-    258: Pokemon(231, 'phanpy', None, False),
-    259: Pokemon(232, 'donphan', None, False),
-    260: Pokemon(233, 'porygon2', None, False),
-    261: Pokemon(234, 'stantler', None, False),
-    262: Pokemon(235, 'smeargle', None, False),
-    263: Pokemon(236, 'tyrogue', None, False),
-    264: Pokemon(237, 'hitmontop', None, False),
-    265: Pokemon(238, 'smoochum', None, False),
-    266: Pokemon(239, 'elekid', None, False),
-    267: Pokemon(240, 'magby', None, False),
-    268: Pokemon(241, 'miltank', None, False),
-    269: Pokemon(242, 'blissey', None, False),
-    270: Pokemon(243, 'raikou', None, False),
-    271: Pokemon(244, 'entei', None, False),
-    272: Pokemon(245, 'suicune', None, False),
-    273: Pokemon(246, 'larvitar', None, False),
-    274: Pokemon(247, 'pupitar', None, False),
-    275: Pokemon(248, 'tyranitar', None, False),
-    276: Pokemon(249, 'lugia', None, False),
-    277: Pokemon(250, 'ho-oh', None, False),
-    278: Pokemon(251, 'celebi', None, False),
-    279: Pokemon(251, 'celebi', 'shiny', False),  # XXX Not a form
-    280: Pokemon(252, 'treecko', None, False),
-    281: Pokemon(253, 'grovyle', None, False),
-    282: Pokemon(254, 'sceptile', None, False),
-    283: Pokemon(255, 'torchic', None, False),
-    284: Pokemon(256, 'combusken', None, False),
-    285: Pokemon(257, 'blaziken', None, False),
-    286: Pokemon(258, 'mudkip', None, False),
-    287: Pokemon(259, 'marshtomp', None, False),
-    288: Pokemon(260, 'swampert', None, False),
-    289: Pokemon(261, 'poochyena', None, False),
-    290: Pokemon(262, 'mightyena', None, False),
-    291: Pokemon(263, 'zigzagoon', None, False),
-    292: Pokemon(264, 'linoone', None, False),
-    293: Pokemon(265, 'wurmple', None, False),
-    294: Pokemon(266, 'silcoon', None, False),
-    295: Pokemon(267, 'beautifly', None, False),
-    296: Pokemon(268, 'cascoon', None, False),
-    297: Pokemon(269, 'dustox', None, False),
-    298: Pokemon(270, 'lotad', None, False),
-    299: Pokemon(271, 'lombre', None, False),
-    300: Pokemon(272, 'ludicolo', None, False),
-    301: Pokemon(273, 'seedot', None, False),
-    302: Pokemon(274, 'nuzleaf', None, False),
-    303: Pokemon(275, 'shiftry', None, False),
-    304: Pokemon(276, 'taillow', None, False),
-    305: Pokemon(277, 'swellow', None, False),
-    306: Pokemon(278, 'wingull', None, False),
-    307: Pokemon(279, 'pelipper', None, False),
-    308: Pokemon(280, 'ralts', None, False),
-    309: Pokemon(281, 'kirlia', None, False),
-    310: Pokemon(282, 'gardevoir', None, False),
-    311: Pokemon(283, 'surskit', None, False),
-    312: Pokemon(284, 'masquerain', None, False),
-    313: Pokemon(285, 'shroomish', None, False),
-    314: Pokemon(286, 'breloom', None, False),
-    315: Pokemon(287, 'slakoth', None, False),
-    316: Pokemon(288, 'vigoroth', None, False),
-    317: Pokemon(289, 'slaking', None, False),
-    318: Pokemon(290, 'nincada', None, False),
-    319: Pokemon(291, 'ninjask', None, False),
-    320: Pokemon(292, 'shedinja', None, False),
-    321: Pokemon(293, 'whismur', None, False),
-    322: Pokemon(294, 'loudred', None, False),
-    323: Pokemon(295, 'exploud', None, False),
-    324: Pokemon(296, 'makuhita', None, False),
-    325: Pokemon(297, 'hariyama', None, False),
-    326: Pokemon(298, 'azurill', None, False),
-    327: Pokemon(299, 'nosepass', None, False),
-    328: Pokemon(300, 'skitty', None, False),
-    329: Pokemon(301, 'delcatty', None, False),
-    330: Pokemon(302, 'sableye', None, False),
-    331: Pokemon(303, 'mawile', None, False),
-    332: Pokemon(304, 'aron', None, False),
-    333: Pokemon(305, 'lairon', None, False),
-    334: Pokemon(306, 'aggron', None, False),
-    335: Pokemon(307, 'meditite', None, False),
-    336: Pokemon(308, 'medicham', None, False),
-    337: Pokemon(309, 'electrike', None, False),
-    338: Pokemon(310, 'manectric', None, False),
-    339: Pokemon(311, 'plusle', None, False),
-    340: Pokemon(312, 'minun', None, False),
-    341: Pokemon(313, 'volbeat', None, False),
-    342: Pokemon(314, 'illumise', None, False),
-    343: Pokemon(315, 'roselia', None, False),
-    344: Pokemon(316, 'gulpin', None, False),
-    345: Pokemon(317, 'swalot', None, False),
-    346: Pokemon(318, 'carvanha', None, False),
-    347: Pokemon(319, 'sharpedo', None, False),
-    348: Pokemon(320, 'wailmer', None, False),
-    349: Pokemon(321, 'wailord', None, False),
-    350: Pokemon(322, 'numel', None, False),
-    351: Pokemon(323, 'camerupt', None, False),
-    352: Pokemon(324, 'torkoal', None, False),
-    353: Pokemon(325, 'spoink', None, False),
-    354: Pokemon(326, 'grumpig', None, False),
-    355: Pokemon(327, 'spinda', None, False),
-    356: Pokemon(328, 'trapinch', None, False),
-    357: Pokemon(329, 'vibrava', None, False),
-    358: Pokemon(330, 'flygon', None, False),
-    359: Pokemon(331, 'cacnea', None, False),
-    360: Pokemon(332, 'cacturne', None, False),
-    361: Pokemon(333, 'swablu', None, False),
-    362: Pokemon(334, 'altaria', None, False),
-    363: Pokemon(335, 'zangoose', None, False),
-    364: Pokemon(336, 'seviper', None, False),
-    365: Pokemon(337, 'lunatone', None, False),
-    366: Pokemon(338, 'solrock', None, False),
-    367: Pokemon(339, 'barboach', None, False),
-    368: Pokemon(340, 'whiscash', None, False),
-    369: Pokemon(341, 'corphish', None, False),
-    370: Pokemon(342, 'crawdaunt', None, False),
-    371: Pokemon(343, 'baltoy', None, False),
-    372: Pokemon(344, 'claydol', None, False),
-    373: Pokemon(345, 'lileep', None, False),
-    374: Pokemon(346, 'cradily', None, False),
-    375: Pokemon(347, 'anorith', None, False),
-    376: Pokemon(348, 'armaldo', None, False),
-    377: Pokemon(349, 'feebas', None, False),
-    378: Pokemon(350, 'milotic', None, False),
-    379: Pokemon(351, 'castform', None, False),
-    380: Pokemon(351, 'castform', 'snowy', False),
-    381: Pokemon(351, 'castform', 'sunny', False),
-    382: Pokemon(351, 'castform', 'rainy', False),
-    383: Pokemon(352, 'kecleon', None, False),
-    384: Pokemon(352, 'kecleon', 'purple', False),  # XXX Unusual form
-    385: Pokemon(353, 'shuppet', None, False),
-    386: Pokemon(354, 'banette', None, False),
-    387: Pokemon(355, 'duskull', None, False),
-    388: Pokemon(356, 'dusclops', None, False),
-    389: Pokemon(357, 'tropius', None, False),
-    390: Pokemon(358, 'chimecho', None, False),
-    391: Pokemon(359, 'absol', None, False),
-    392: Pokemon(360, 'wynaut', None, False),
-    393: Pokemon(361, 'snorunt', None, False),
-    394: Pokemon(362, 'glalie', None, False),
-    395: Pokemon(363, 'spheal', None, False),
-    396: Pokemon(364, 'sealeo', None, False),
-    397: Pokemon(365, 'walrein', None, False),
-    398: Pokemon(366, 'clamperl', None, False),
-    399: Pokemon(367, 'huntail', None, False),
-    400: Pokemon(368, 'gorebyss', None, False),
-    401: Pokemon(369, 'relicanth', None, False),
-    402: Pokemon(370, 'luvdisc', None, False),
-    403: Pokemon(371, 'bagon', None, False),
-    404: Pokemon(372, 'shelgon', None, False),
-    405: Pokemon(373, 'salamence', None, False),
-    406: Pokemon(374, 'beldum', None, False),
-    407: Pokemon(375, 'metang', None, False),
-    408: Pokemon(376, 'metagross', None, False),
-    409: Pokemon(377, 'regirock', None, False),
-    410: Pokemon(378, 'regice', None, False),
-    411: Pokemon(379, 'registeel', None, False),
-    412: Pokemon(380, 'latias', None, False),
-    413: Pokemon(381, 'latios', None, False),
-    414: Pokemon(382, 'kyogre', None, False),
-    415: Pokemon(383, 'groudon', None, False),
-    416: Pokemon(384, 'rayquaza', None, False),
-    417: Pokemon(385, 'jirachi', None, False),
-    418: Pokemon(386, 'deoxys', 'normal', False),
-    419: Pokemon(386, 'deoxys', 'attack', False),
-    420: Pokemon(386, 'deoxys', 'defense', False),
-    421: Pokemon(386, 'deoxys', 'speed', False),
-    422: Pokemon(387, 'turtwig', None, False),
-    423: Pokemon(388, 'grotle', None, False),
-    424: Pokemon(389, 'torterra', None, False),
-    425: Pokemon(390, 'chimchar', None, False),
-    426: Pokemon(391, 'monferno', None, False),
-    427: Pokemon(392, 'infernape', None, False),
-    428: Pokemon(393, 'piplup', None, False),
-    429: Pokemon(394, 'prinplup', None, False),
-    430: Pokemon(395, 'empoleon', None, False),
-    431: Pokemon(396, 'starly', None, False),
-    432: Pokemon(397, 'staravia', None, False),
-    433: Pokemon(398, 'staraptor', None, False),
-    434: Pokemon(399, 'bidoof', None, False),
-    435: Pokemon(400, 'bibarel', None, False),
-    436: Pokemon(401, 'kricketot', None, False),
-    437: Pokemon(402, 'kricketune', None, False),
-    438: Pokemon(403, 'shinx', None, False),
-    439: Pokemon(404, 'luxio', None, False),
-    440: Pokemon(405, 'luxray', None, False),
-    441: Pokemon(406, 'budew', None, False),
-    442: Pokemon(407, 'roserade', None, False),
-    443: Pokemon(408, 'cranidos', None, False),
-    444: Pokemon(409, 'rampardos', None, False),
-    445: Pokemon(410, 'shieldon', None, False),
-    446: Pokemon(411, 'bastiodon', None, False),
-    447: Pokemon(412, 'burmy', 'sandy', False),
-    448: Pokemon(412, 'burmy', 'plant', False),
-    449: Pokemon(412, 'burmy', 'trash', False),
-    450: Pokemon(413, 'wormadam', 'sandy', False),
-    451: Pokemon(413, 'wormadam', 'plant', False),
-    452: Pokemon(413, 'wormadam', 'trash', False),
-    453: Pokemon(414, 'mothim', None, False),
-    454: Pokemon(415, 'combee', None, False),
-    455: Pokemon(416, 'vespiquen', None, False),
-    456: Pokemon(417, 'pachirisu', None, False),
-    457: Pokemon(418, 'buizel', None, False),
-    458: Pokemon(419, 'floatzel', None, False),
-    459: Pokemon(420, 'cherubi', None, False),
-    460: Pokemon(421, 'cherrim', 'overcast', False),
-    461: Pokemon(421, 'cherrim', 'sunshine', False),
-    462: Pokemon(422, 'shellos', 'east', False),
-    463: Pokemon(422, 'shellos', 'west', False),
-    464: Pokemon(423, 'gastrodon', 'east', False),
-    465: Pokemon(423, 'gastrodon', 'west', False),
-    466: Pokemon(424, 'ambipom', None, False),
-    467: Pokemon(425, 'drifloon', None, False),
-    468: Pokemon(426, 'drifblim', None, False),
-    469: Pokemon(427, 'buneary', None, False),
-    470: Pokemon(428, 'lopunny', None, False),
-    471: Pokemon(429, 'mismagius', None, False),
-    472: Pokemon(430, 'honchkrow', None, False),
-    473: Pokemon(431, 'glameow', None, False),
-    474: Pokemon(432, 'purugly', None, False),
-    475: Pokemon(433, 'chingling', None, False),
-    476: Pokemon(434, 'stunky', None, False),
-    477: Pokemon(435, 'skuntank', None, False),
-    478: Pokemon(436, 'bronzor', None, False),
-    479: Pokemon(437, 'bronzong', None, False),
-    480: Pokemon(438, 'bonsly', None, False),
-    481: Pokemon(439, 'mime-jr', None, False),
-    482: Pokemon(440, 'happiny', None, False),
-    483: Pokemon(441, 'chatot', None, False),
-    484: Pokemon(442, 'spiritomb', None, False),
-    485: Pokemon(443, 'gible', None, False),
-    486: Pokemon(444, 'gabite', None, False),
-    487: Pokemon(445, 'garchomp', None, False),
-    488: Pokemon(446, 'munchlax', None, False),
-    489: Pokemon(447, 'riolu', None, False),
-    490: Pokemon(448, 'lucario', None, False),
-    491: Pokemon(449, 'hippopotas', None, False),
-    492: Pokemon(450, 'hippowdon', None, False),
-    493: Pokemon(451, 'skorupi', None, False),
-    494: Pokemon(452, 'drapion', None, False),
-    495: Pokemon(453, 'croagunk', None, False),
-    496: Pokemon(454, 'toxicroak', None, False),
-    497: Pokemon(455, 'carnivine', None, False),
-    498: Pokemon(456, 'finneon', None, False),
-    499: Pokemon(457, 'lumineon', None, False),
-    500: Pokemon(458, 'mantyke', None, False),
-    501: Pokemon(459, 'snover', None, False),
-    502: Pokemon(460, 'abomasnow', None, False),
-    503: Pokemon(461, 'weavile', None, False),
-    504: Pokemon(462, 'magnezone', None, False),
-    505: Pokemon(463, 'lickilicky', None, False),
-    506: Pokemon(464, 'rhyperior', None, False),
-    507: Pokemon(465, 'tangrowth', None, False),
-    508: Pokemon(466, 'electivire', None, False),
-    509: Pokemon(467, 'magmortar', None, False),
-    510: Pokemon(468, 'togekiss', None, False),
-    511: Pokemon(469, 'yanmega', None, False),
-    512: Pokemon(470, 'leafeon', None, False),
-    513: Pokemon(471, 'glaceon', None, False),
-    514: Pokemon(472, 'gliscor', None, False),
-    515: Pokemon(473, 'mamoswine', None, False),
-    516: Pokemon(474, 'porygon-z', None, False),
-    517: Pokemon(475, 'gallade', None, False),
-    518: Pokemon(476, 'probopass', None, False),
-    519: Pokemon(477, 'dusknoir', None, False),
-    520: Pokemon(478, 'froslass', None, False),
-    521: Pokemon(479, 'rotom', None, False),
-    522: Pokemon(480, 'uxie', None, False),
-    523: Pokemon(481, 'mesprit', None, False),
-    524: Pokemon(482, 'azelf', None, False),
-    525: Pokemon(483, 'dialga', None, False),
-    526: Pokemon(484, 'palkia', None, False),
-    527: Pokemon(485, 'heatran', None, False),
-    528: Pokemon(486, 'regigigas', None, False),
-    529: Pokemon(487, 'giratina', 'altered', False),
-    530: Pokemon(488, 'cresselia', None, False),
-    531: Pokemon(489, 'phione', None, False),
-    532: Pokemon(490, 'manaphy', None, False),
-    533: Pokemon(491, 'darkrai', None, False),
-    534: Pokemon(492, 'shaymin', 'land', False),
-    535: Pokemon(492, 'shaymin', 'sky', False),
-    536: Pokemon(487, 'giratina', 'origin', False),
+# Forms that also get sprites under the plain national ID, because they're the
+# form you'd expect by default
+default_forms = frozenset([
+    (201, 'a'), (386, 'normal'), (412, 'plant'), (413, 'plant'),
+    (421, 'overcast'), (422, 'west'), (423, 'west'), (487, 'altered'),
+    (492, 'land')
+])
+
+def _build_sky():
+    """Build the dict of Explorers of Sky Pokémon, by internal ID."""
+
+    return {
+        1: Pokemon(1, 'bulbasaur', None, False),
+        2: Pokemon(2, 'ivysaur', None, False),
+        3: Pokemon(3, 'venusaur', None, False),
+        4: Pokemon(4, 'charmander', None, False),
+        5: Pokemon(5, 'charmeleon', None, False),
+        6: Pokemon(6, 'charizard', None, False),
+        7: Pokemon(7, 'squirtle', None, False),
+        8: Pokemon(8, 'wartortle', None, False),
+        9: Pokemon(9, 'blastoise', None, False),
+        10: Pokemon(10, 'caterpie', None, False),
+        11: Pokemon(11, 'metapod', None, False),
+        12: Pokemon(12, 'butterfree', None, False),
+        13: Pokemon(13, 'weedle', None, False),
+        14: Pokemon(14, 'kakuna', None, False),
+        15: Pokemon(15, 'beedrill', None, False),
+        16: Pokemon(16, 'pidgey', None, False),
+        17: Pokemon(17, 'pidgeotto', None, False),
+        18: Pokemon(18, 'pidgeot', None, False),
+        19: Pokemon(19, 'rattata', None, False),
+        20: Pokemon(20, 'raticate', None, False),
+        21: Pokemon(21, 'spearow', None, False),
+        22: Pokemon(22, 'fearow', None, False),
+        23: Pokemon(23, 'ekans', None, False),
+        24: Pokemon(24, 'arbok', None, False),
+        25: Pokemon(25, 'pikachu', None, False),
+        26: Pokemon(26, 'raichu', None, False),
+        27: Pokemon(27, 'sandshrew', None, False),
+        28: Pokemon(28, 'sandslash', None, False),
+        29: Pokemon(29, 'nidoran-f', None, False),
+        30: Pokemon(30, 'nidorina', None, False),
+        31: Pokemon(31, 'nidoqueen', None, False),
+        32: Pokemon(32, 'nidoran-m', None, False),
+        33: Pokemon(33, 'nidorino', None, False),
+        34: Pokemon(34, 'nidoking', None, False),
+        35: Pokemon(35, 'clefairy', None, False),
+        36: Pokemon(36, 'clefable', None, False),
+        37: Pokemon(37, 'vulpix', None, False),
+        38: Pokemon(38, 'ninetales', None, False),
+        39: Pokemon(39, 'jigglypuff', None, False),
+        40: Pokemon(40, 'wigglytuff', None, False),
+        41: Pokemon(41, 'zubat', None, False),
+        42: Pokemon(42, 'golbat', None, False),
+        43: Pokemon(43, 'oddish', None, False),
+        44: Pokemon(44, 'gloom', None, False),
+        45: Pokemon(45, 'vileplume', None, False),
+        46: Pokemon(46, 'paras', None, False),
+        47: Pokemon(47, 'parasect', None, False),
+        48: Pokemon(48, 'venonat', None, False),
+        49: Pokemon(49, 'venomoth', None, False),
+        50: Pokemon(50, 'diglett', None, False),
+        51: Pokemon(51, 'dugtrio', None, False),
+        52: Pokemon(52, 'meowth', None, False),
+        53: Pokemon(53, 'persian', None, False),
+        54: Pokemon(54, 'psyduck', None, False),
+        55: Pokemon(55, 'golduck', None, False),
+        56: Pokemon(56, 'mankey', None, False),
+        57: Pokemon(57, 'primeape', None, False),
+        58: Pokemon(58, 'growlithe', None, False),
+        59: Pokemon(59, 'arcanine', None, False),
+        60: Pokemon(60, 'poliwag', None, False),
+        61: Pokemon(61, 'poliwhirl', None, False),
+        62: Pokemon(62, 'poliwrath', None, False),
+        63: Pokemon(63, 'abra', None, False),
+        64: Pokemon(64, 'kadabra', None, False),
+        65: Pokemon(65, 'alakazam', None, False),
+        66: Pokemon(66, 'machop', None, False),
+        67: Pokemon(67, 'machoke', None, False),
+        68: Pokemon(68, 'machamp', None, False),
+        69: Pokemon(69, 'bellsprout', None, False),
+        70: Pokemon(70, 'weepinbell', None, False),
+        71: Pokemon(71, 'victreebel', None, False),
+        72: Pokemon(72, 'tentacool', None, False),
+        73: Pokemon(73, 'tentacruel', None, False),
+        74: Pokemon(74, 'geodude', None, False),
+        75: Pokemon(75, 'graveler', None, False),
+        76: Pokemon(76, 'golem', None, False),
+        77: Pokemon(77, 'ponyta', None, False),
+        78: Pokemon(78, 'rapidash', None, False),
+        79: Pokemon(79, 'slowpoke', None, False),
+        80: Pokemon(80, 'slowbro', None, False),
+        81: Pokemon(81, 'magnemite', None, False),
+        82: Pokemon(82, 'magneton', None, False),
+        83: Pokemon(83, 'farfetchd', None, False),
+        84: Pokemon(84, 'doduo', None, False),
+        85: Pokemon(85, 'dodrio', None, False),
+        86: Pokemon(86, 'seel', None, False),
+        87: Pokemon(87, 'dewgong', None, False),
+        88: Pokemon(88, 'grimer', None, False),
+        89: Pokemon(89, 'muk', None, False),
+        90: Pokemon(90, 'shellder', None, False),
+        91: Pokemon(91, 'cloyster', None, False),
+        92: Pokemon(92, 'gastly', None, False),
+        93: Pokemon(93, 'haunter', None, False),
+        94: Pokemon(94, 'gengar', None, False),
+        95: Pokemon(95, 'onix', None, False),
+        96: Pokemon(96, 'drowzee', None, False),
+        97: Pokemon(97, 'hypno', None, False),
+        98: Pokemon(98, 'krabby', None, False),
+        99: Pokemon(99, 'kingler', None, False),
+        100: Pokemon(100, 'voltorb', None, False),
+        101: Pokemon(101, 'electrode', None, False),
+        102: Pokemon(102, 'exeggcute', None, False),
+        103: Pokemon(103, 'exeggutor', None, False),
+        104: Pokemon(104, 'cubone', None, False),
+        105: Pokemon(105, 'marowak', None, False),
+        106: Pokemon(106, 'hitmonlee', None, False),
+        107: Pokemon(107, 'hitmonchan', None, False),
+        108: Pokemon(108, 'lickitung', None, False),
+        109: Pokemon(109, 'koffing', None, False),
+        110: Pokemon(110, 'weezing', None, False),
+        111: Pokemon(111, 'rhyhorn', None, False),
+        112: Pokemon(112, 'rhydon', None, False),
+        113: Pokemon(113, 'chansey', None, False),
+        114: Pokemon(114, 'tangela', None, False),
+        115: Pokemon(115, 'kangaskhan', None, False),
+        116: Pokemon(116, 'horsea', None, False),
+        117: Pokemon(117, 'seadra', None, False),
+        118: Pokemon(118, 'goldeen', None, False),
+        119: Pokemon(119, 'seaking', None, False),
+        120: Pokemon(120, 'staryu', None, False),
+        121: Pokemon(121, 'starmie', None, False),
+        122: Pokemon(122, 'mr-mime', None, False),
+        123: Pokemon(123, 'scyther', None, False),
+        124: Pokemon(124, 'jynx', None, False),
+        125: Pokemon(125, 'electabuzz', None, False),
+        126: Pokemon(126, 'magmar', None, False),
+        127: Pokemon(127, 'pinsir', None, False),
+        128: Pokemon(128, 'tauros', None, False),
+        129: Pokemon(129, 'magikarp', None, False),
+        130: Pokemon(130, 'gyarados', None, False),
+        131: Pokemon(131, 'lapras', None, False),
+        132: Pokemon(132, 'ditto', None, False),
+        133: Pokemon(133, 'eevee', None, False),
+        134: Pokemon(134, 'vaporeon', None, False),
+        135: Pokemon(135, 'jolteon', None, False),
+        136: Pokemon(136, 'flareon', None, False),
+        137: Pokemon(137, 'porygon', None, False),
+        138: Pokemon(138, 'omanyte', None, False),
+        139: Pokemon(139, 'omastar', None, False),
+        140: Pokemon(140, 'kabuto', None, False),
+        141: Pokemon(141, 'kabutops', None, False),
+        142: Pokemon(142, 'aerodactyl', None, False),
+        143: Pokemon(143, 'snorlax', None, False),
+        144: Pokemon(144, 'articuno', None, False),
+        145: Pokemon(145, 'zapdos', None, False),
+        146: Pokemon(146, 'moltres', None, False),
+        147: Pokemon(147, 'dratini', None, False),
+        148: Pokemon(148, 'dragonair', None, False),
+        149: Pokemon(149, 'dragonite', None, False),
+        150: Pokemon(150, 'mewtwo', None, False),
+        151: Pokemon(151, 'mew', None, False),
+        152: Pokemon(152, 'chikorita', None, False),
+        153: Pokemon(153, 'bayleef', None, False),
+        154: Pokemon(154, 'meganium', None, False),
+        155: Pokemon(155, 'cyndaquil', None, False),
+        156: Pokemon(156, 'quilava', None, False),
+        157: Pokemon(157, 'typhlosion', None, False),
+        158: Pokemon(158, 'totodile', None, False),
+        159: Pokemon(159, 'croconaw', None, False),
+        160: Pokemon(160, 'feraligatr', None, False),
+        161: Pokemon(161, 'sentret', None, False),
+        162: Pokemon(162, 'furret', None, False),
+        163: Pokemon(163, 'hoothoot', None, False),
+        164: Pokemon(164, 'noctowl', None, False),
+        165: Pokemon(165, 'ledyba', None, False),
+        166: Pokemon(166, 'ledian', None, False),
+        167: Pokemon(167, 'spinarak', None, False),
+        168: Pokemon(168, 'ariados', None, False),
+        169: Pokemon(169, 'crobat', None, False),
+        170: Pokemon(170, 'chinchou', None, False),
+        171: Pokemon(171, 'lanturn', None, False),
+        172: Pokemon(172, 'pichu', None, False),
+        173: Pokemon(173, 'cleffa', None, False),
+        174: Pokemon(174, 'igglybuff', None, False),
+        175: Pokemon(175, 'togepi', None, False),
+        176: Pokemon(176, 'togetic', None, False),
+        177: Pokemon(177, 'natu', None, False),
+        178: Pokemon(178, 'xatu', None, False),
+        179: Pokemon(179, 'mareep', None, False),
+        180: Pokemon(180, 'flaaffy', None, False),
+        181: Pokemon(181, 'ampharos', None, False),
+        182: Pokemon(182, 'bellossom', None, False),
+        183: Pokemon(183, 'marill', None, False),
+        184: Pokemon(184, 'azumarill', None, False),
+        185: Pokemon(185, 'sudowoodo', None, False),
+        186: Pokemon(186, 'politoed', None, False),
+        187: Pokemon(187, 'hoppip', None, False),
+        188: Pokemon(188, 'skiploom', None, False),
+        189: Pokemon(189, 'jumpluff', None, False),
+        190: Pokemon(190, 'aipom', None, False),
+        191: Pokemon(191, 'sunkern', None, False),
+        192: Pokemon(192, 'sunflora', None, False),
+        193: Pokemon(193, 'yanma', None, False),
+        194: Pokemon(194, 'wooper', None, False),
+        195: Pokemon(195, 'quagsire', None, False),
+        196: Pokemon(196, 'espeon', None, False),
+        197: Pokemon(197, 'umbreon', None, False),
+        198: Pokemon(198, 'murkrow', None, False),
+        199: Pokemon(199, 'slowking', None, False),
+        200: Pokemon(200, 'misdreavus', None, False),
+        201: Pokemon(201, 'unown', 'a', False),
+        202: Pokemon(201, 'unown', 'b', False),
+        203: Pokemon(201, 'unown', 'c', False),
+        204: Pokemon(201, 'unown', 'd', False),
+        205: Pokemon(201, 'unown', 'e', False),
+        206: Pokemon(201, 'unown', 'f', False),
+        207: Pokemon(201, 'unown', 'g', False),
+        208: Pokemon(201, 'unown', 'h', False),
+        209: Pokemon(201, 'unown', 'i', False),
+        210: Pokemon(201, 'unown', 'j', False),
+        211: Pokemon(201, 'unown', 'k', False),
+        212: Pokemon(201, 'unown', 'l', False),
+        213: Pokemon(201, 'unown', 'm', False),
+        214: Pokemon(201, 'unown', 'n', False),
+        215: Pokemon(201, 'unown', 'o', False),
+        216: Pokemon(201, 'unown', 'p', False),
+        217: Pokemon(201, 'unown', 'q', False),
+        218: Pokemon(201, 'unown', 'r', False),
+        219: Pokemon(201, 'unown', 's', False),
+        220: Pokemon(201, 'unown', 't', False),
+        221: Pokemon(201, 'unown', 'u', False),
+        222: Pokemon(201, 'unown', 'v', False),
+        223: Pokemon(201, 'unown', 'w', False),
+        224: Pokemon(201, 'unown', 'x', False),
+        225: Pokemon(201, 'unown', 'y', False),
+        226: Pokemon(201, 'unown', 'z', False),
+        227: Pokemon(201, 'unown', 'exclamation', False),
+        228: Pokemon(201, 'unown', 'question', False),
+        229: Pokemon(202, 'wobbuffet', None, False),
+        230: Pokemon(203, 'girafarig', None, False),
+        231: Pokemon(204, 'pineco', None, False),
+        232: Pokemon(205, 'forretress', None, False),
+        233: Pokemon(206, 'dunsparce', None, False),
+        234: Pokemon(207, 'gligar', None, False),
+        235: Pokemon(208, 'steelix', None, False),
+        236: Pokemon(209, 'snubbull', None, False),
+        237: Pokemon(210, 'granbull', None, False),
+        238: Pokemon(211, 'qwilfish', None, False),
+        239: Pokemon(212, 'scizor', None, False),
+        240: Pokemon(213, 'shuckle', None, False),
+        241: Pokemon(214, 'heracross', None, False),
+        242: Pokemon(215, 'sneasel', None, False),
+        243: Pokemon(216, 'teddiursa', None, False),
+        244: Pokemon(217, 'ursaring', None, False),
+        245: Pokemon(218, 'slugma', None, False),
+        246: Pokemon(219, 'magcargo', None, False),
+        247: Pokemon(220, 'swinub', None, False),
+        248: Pokemon(221, 'piloswine', None, False),
+        249: Pokemon(222, 'corsola', None, False),
+        250: Pokemon(223, 'remoraid', None, False),
+        251: Pokemon(224, 'octillery', None, False),
+        252: Pokemon(225, 'delibird', None, False),
+        253: Pokemon(226, 'mantine', None, False),
+        254: Pokemon(227, 'skarmory', None, False),
+        255: Pokemon(228, 'houndour', None, False),
+        256: Pokemon(229, 'houndoom', None, False),
+        257: Pokemon(230, 'kingdra', None, False),
+        258: Pokemon(231, 'phanpy', None, False),
+        259: Pokemon(232, 'donphan', None, False),
+        260: Pokemon(233, 'porygon2', None, False),
+        261: Pokemon(234, 'stantler', None, False),
+        262: Pokemon(235, 'smeargle', None, False),
+        263: Pokemon(236, 'tyrogue', None, False),
+        264: Pokemon(237, 'hitmontop', None, False),
+        265: Pokemon(238, 'smoochum', None, False),
+        266: Pokemon(239, 'elekid', None, False),
+        267: Pokemon(240, 'magby', None, False),
+        268: Pokemon(241, 'miltank', None, False),
+        269: Pokemon(242, 'blissey', None, False),
+        270: Pokemon(243, 'raikou', None, False),
+        271: Pokemon(244, 'entei', None, False),
+        272: Pokemon(245, 'suicune', None, False),
+        273: Pokemon(246, 'larvitar', None, False),
+        274: Pokemon(247, 'pupitar', None, False),
+        275: Pokemon(248, 'tyranitar', None, False),
+        276: Pokemon(249, 'lugia', None, False),
+        277: Pokemon(250, 'ho-oh', None, False),
+        278: Pokemon(251, 'celebi', None, False),
+        279: Pokemon(251, 'celebi', 'shiny', False),  # XXX Not a form
+        280: Pokemon(252, 'treecko', None, False),
+        281: Pokemon(253, 'grovyle', None, False),
+        282: Pokemon(254, 'sceptile', None, False),
+        283: Pokemon(255, 'torchic', None, False),
+        284: Pokemon(256, 'combusken', None, False),
+        285: Pokemon(257, 'blaziken', None, False),
+        286: Pokemon(258, 'mudkip', None, False),
+        287: Pokemon(259, 'marshtomp', None, False),
+        288: Pokemon(260, 'swampert', None, False),
+        289: Pokemon(261, 'poochyena', None, False),
+        290: Pokemon(262, 'mightyena', None, False),
+        291: Pokemon(263, 'zigzagoon', None, False),
+        292: Pokemon(264, 'linoone', None, False),
+        293: Pokemon(265, 'wurmple', None, False),
+        294: Pokemon(266, 'silcoon', None, False),
+        295: Pokemon(267, 'beautifly', None, False),
+        296: Pokemon(268, 'cascoon', None, False),
+        297: Pokemon(269, 'dustox', None, False),
+        298: Pokemon(270, 'lotad', None, False),
+        299: Pokemon(271, 'lombre', None, False),
+        300: Pokemon(272, 'ludicolo', None, False),
+        301: Pokemon(273, 'seedot', None, False),
+        302: Pokemon(274, 'nuzleaf', None, False),
+        303: Pokemon(275, 'shiftry', None, False),
+        304: Pokemon(276, 'taillow', None, False),
+        305: Pokemon(277, 'swellow', None, False),
+        306: Pokemon(278, 'wingull', None, False),
+        307: Pokemon(279, 'pelipper', None, False),
+        308: Pokemon(280, 'ralts', None, False),
+        309: Pokemon(281, 'kirlia', None, False),
+        310: Pokemon(282, 'gardevoir', None, False),
+        311: Pokemon(283, 'surskit', None, False),
+        312: Pokemon(284, 'masquerain', None, False),
+        313: Pokemon(285, 'shroomish', None, False),
+        314: Pokemon(286, 'breloom', None, False),
+        315: Pokemon(287, 'slakoth', None, False),
+        316: Pokemon(288, 'vigoroth', None, False),
+        317: Pokemon(289, 'slaking', None, False),
+        318: Pokemon(290, 'nincada', None, False),
+        319: Pokemon(291, 'ninjask', None, False),
+        320: Pokemon(292, 'shedinja', None, False),
+        321: Pokemon(293, 'whismur', None, False),
+        322: Pokemon(294, 'loudred', None, False),
+        323: Pokemon(295, 'exploud', None, False),
+        324: Pokemon(296, 'makuhita', None, False),
+        325: Pokemon(297, 'hariyama', None, False),
+        326: Pokemon(298, 'azurill', None, False),
+        327: Pokemon(299, 'nosepass', None, False),
+        328: Pokemon(300, 'skitty', None, False),
+        329: Pokemon(301, 'delcatty', None, False),
+        330: Pokemon(302, 'sableye', None, False),
+        331: Pokemon(303, 'mawile', None, False),
+        332: Pokemon(304, 'aron', None, False),
+        333: Pokemon(305, 'lairon', None, False),
+        334: Pokemon(306, 'aggron', None, False),
+        335: Pokemon(307, 'meditite', None, False),
+        336: Pokemon(308, 'medicham', None, False),
+        337: Pokemon(309, 'electrike', None, False),
+        338: Pokemon(310, 'manectric', None, False),
+        339: Pokemon(311, 'plusle', None, False),
+        340: Pokemon(312, 'minun', None, False),
+        341: Pokemon(313, 'volbeat', None, False),
+        342: Pokemon(314, 'illumise', None, False),
+        343: Pokemon(315, 'roselia', None, False),
+        344: Pokemon(316, 'gulpin', None, False),
+        345: Pokemon(317, 'swalot', None, False),
+        346: Pokemon(318, 'carvanha', None, False),
+        347: Pokemon(319, 'sharpedo', None, False),
+        348: Pokemon(320, 'wailmer', None, False),
+        349: Pokemon(321, 'wailord', None, False),
+        350: Pokemon(322, 'numel', None, False),
+        351: Pokemon(323, 'camerupt', None, False),
+        352: Pokemon(324, 'torkoal', None, False),
+        353: Pokemon(325, 'spoink', None, False),
+        354: Pokemon(326, 'grumpig', None, False),
+        355: Pokemon(327, 'spinda', None, False),
+        356: Pokemon(328, 'trapinch', None, False),
+        357: Pokemon(329, 'vibrava', None, False),
+        358: Pokemon(330, 'flygon', None, False),
+        359: Pokemon(331, 'cacnea', None, False),
+        360: Pokemon(332, 'cacturne', None, False),
+        361: Pokemon(333, 'swablu', None, False),
+        362: Pokemon(334, 'altaria', None, False),
+        363: Pokemon(335, 'zangoose', None, False),
+        364: Pokemon(336, 'seviper', None, False),
+        365: Pokemon(337, 'lunatone', None, False),
+        366: Pokemon(338, 'solrock', None, False),
+        367: Pokemon(339, 'barboach', None, False),
+        368: Pokemon(340, 'whiscash', None, False),
+        369: Pokemon(341, 'corphish', None, False),
+        370: Pokemon(342, 'crawdaunt', None, False),
+        371: Pokemon(343, 'baltoy', None, False),
+        372: Pokemon(344, 'claydol', None, False),
+        373: Pokemon(345, 'lileep', None, False),
+        374: Pokemon(346, 'cradily', None, False),
+        375: Pokemon(347, 'anorith', None, False),
+        376: Pokemon(348, 'armaldo', None, False),
+        377: Pokemon(349, 'feebas', None, False),
+        378: Pokemon(350, 'milotic', None, False),
+        379: Pokemon(351, 'castform', None, False),
+        380: Pokemon(351, 'castform', 'snowy', False),
+        381: Pokemon(351, 'castform', 'sunny', False),
+        382: Pokemon(351, 'castform', 'rainy', False),
+        383: Pokemon(352, 'kecleon', None, False),
+        384: Pokemon(352, 'kecleon', 'purple', False),  # XXX Unusual form
+        385: Pokemon(353, 'shuppet', None, False),
+        386: Pokemon(354, 'banette', None, False),
+        387: Pokemon(355, 'duskull', None, False),
+        388: Pokemon(356, 'dusclops', None, False),
+        389: Pokemon(357, 'tropius', None, False),
+        390: Pokemon(358, 'chimecho', None, False),
+        391: Pokemon(359, 'absol', None, False),
+        392: Pokemon(360, 'wynaut', None, False),
+        393: Pokemon(361, 'snorunt', None, False),
+        394: Pokemon(362, 'glalie', None, False),
+        395: Pokemon(363, 'spheal', None, False),
+        396: Pokemon(364, 'sealeo', None, False),
+        397: Pokemon(365, 'walrein', None, False),
+        398: Pokemon(366, 'clamperl', None, False),
+        399: Pokemon(367, 'huntail', None, False),
+        400: Pokemon(368, 'gorebyss', None, False),
+        401: Pokemon(369, 'relicanth', None, False),
+        402: Pokemon(370, 'luvdisc', None, False),
+        403: Pokemon(371, 'bagon', None, False),
+        404: Pokemon(372, 'shelgon', None, False),
+        405: Pokemon(373, 'salamence', None, False),
+        406: Pokemon(374, 'beldum', None, False),
+        407: Pokemon(375, 'metang', None, False),
+        408: Pokemon(376, 'metagross', None, False),
+        409: Pokemon(377, 'regirock', None, False),
+        410: Pokemon(378, 'regice', None, False),
+        411: Pokemon(379, 'registeel', None, False),
+        412: Pokemon(380, 'latias', None, False),
+        413: Pokemon(381, 'latios', None, False),
+        414: Pokemon(382, 'kyogre', None, False),
+        415: Pokemon(383, 'groudon', None, False),
+        416: Pokemon(384, 'rayquaza', None, False),
+        417: Pokemon(385, 'jirachi', None, False),
+        418: Pokemon(386, 'deoxys', 'normal', False),
+        419: Pokemon(386, 'deoxys', 'attack', False),
+        420: Pokemon(386, 'deoxys', 'defense', False),
+        421: Pokemon(386, 'deoxys', 'speed', False),
+        422: Pokemon(387, 'turtwig', None, False),
+        423: Pokemon(388, 'grotle', None, False),
+        424: Pokemon(389, 'torterra', None, False),
+        425: Pokemon(390, 'chimchar', None, False),
+        426: Pokemon(391, 'monferno', None, False),
+        427: Pokemon(392, 'infernape', None, False),
+        428: Pokemon(393, 'piplup', None, False),
+        429: Pokemon(394, 'prinplup', None, False),
+        430: Pokemon(395, 'empoleon', None, False),
+        431: Pokemon(396, 'starly', None, False),
+        432: Pokemon(397, 'staravia', None, False),
+        433: Pokemon(398, 'staraptor', None, False),
+        434: Pokemon(399, 'bidoof', None, False),
+        435: Pokemon(400, 'bibarel', None, False),
+        436: Pokemon(401, 'kricketot', None, False),
+        437: Pokemon(402, 'kricketune', None, False),
+        438: Pokemon(403, 'shinx', None, False),
+        439: Pokemon(404, 'luxio', None, False),
+        440: Pokemon(405, 'luxray', None, False),
+        441: Pokemon(406, 'budew', None, False),
+        442: Pokemon(407, 'roserade', None, False),
+        443: Pokemon(408, 'cranidos', None, False),
+        444: Pokemon(409, 'rampardos', None, False),
+        445: Pokemon(410, 'shieldon', None, False),
+        446: Pokemon(411, 'bastiodon', None, False),
+        447: Pokemon(412, 'burmy', 'sandy', False),
+        448: Pokemon(412, 'burmy', 'plant', False),
+        449: Pokemon(412, 'burmy', 'trash', False),
+        450: Pokemon(413, 'wormadam', 'sandy', False),
+        451: Pokemon(413, 'wormadam', 'plant', False),
+        452: Pokemon(413, 'wormadam', 'trash', False),
+        453: Pokemon(414, 'mothim', None, False),
+        454: Pokemon(415, 'combee', None, False),
+        455: Pokemon(416, 'vespiquen', None, False),
+        456: Pokemon(417, 'pachirisu', None, False),
+        457: Pokemon(418, 'buizel', None, False),
+        458: Pokemon(419, 'floatzel', None, False),
+        459: Pokemon(420, 'cherubi', None, False),
+        460: Pokemon(421, 'cherrim', 'overcast', False),
+        461: Pokemon(421, 'cherrim', 'sunshine', False),
+        462: Pokemon(422, 'shellos', 'east', False),
+        463: Pokemon(422, 'shellos', 'west', False),
+        464: Pokemon(423, 'gastrodon', 'east', False),
+        465: Pokemon(423, 'gastrodon', 'west', False),
+        466: Pokemon(424, 'ambipom', None, False),
+        467: Pokemon(425, 'drifloon', None, False),
+        468: Pokemon(426, 'drifblim', None, False),
+        469: Pokemon(427, 'buneary', None, False),
+        470: Pokemon(428, 'lopunny', None, False),
+        471: Pokemon(429, 'mismagius', None, False),
+        472: Pokemon(430, 'honchkrow', None, False),
+        473: Pokemon(431, 'glameow', None, False),
+        474: Pokemon(432, 'purugly', None, False),
+        475: Pokemon(433, 'chingling', None, False),
+        476: Pokemon(434, 'stunky', None, False),
+        477: Pokemon(435, 'skuntank', None, False),
+        478: Pokemon(436, 'bronzor', None, False),
+        479: Pokemon(437, 'bronzong', None, False),
+        480: Pokemon(438, 'bonsly', None, False),
+        481: Pokemon(439, 'mime-jr', None, False),
+        482: Pokemon(440, 'happiny', None, False),
+        483: Pokemon(441, 'chatot', None, False),
+        484: Pokemon(442, 'spiritomb', None, False),
+        485: Pokemon(443, 'gible', None, False),
+        486: Pokemon(444, 'gabite', None, False),
+        487: Pokemon(445, 'garchomp', None, False),
+        488: Pokemon(446, 'munchlax', None, False),
+        489: Pokemon(447, 'riolu', None, False),
+        490: Pokemon(448, 'lucario', None, False),
+        491: Pokemon(449, 'hippopotas', None, False),
+        492: Pokemon(450, 'hippowdon', None, False),
+        493: Pokemon(451, 'skorupi', None, False),
+        494: Pokemon(452, 'drapion', None, False),
+        495: Pokemon(453, 'croagunk', None, False),
+        496: Pokemon(454, 'toxicroak', None, False),
+        497: Pokemon(455, 'carnivine', None, False),
+        498: Pokemon(456, 'finneon', None, False),
+        499: Pokemon(457, 'lumineon', None, False),
+        500: Pokemon(458, 'mantyke', None, False),
+        501: Pokemon(459, 'snover', None, False),
+        502: Pokemon(460, 'abomasnow', None, False),
+        503: Pokemon(461, 'weavile', None, False),
+        504: Pokemon(462, 'magnezone', None, False),
+        505: Pokemon(463, 'lickilicky', None, False),
+        506: Pokemon(464, 'rhyperior', None, False),
+        507: Pokemon(465, 'tangrowth', None, False),
+        508: Pokemon(466, 'electivire', None, False),
+        509: Pokemon(467, 'magmortar', None, False),
+        510: Pokemon(468, 'togekiss', None, False),
+        511: Pokemon(469, 'yanmega', None, False),
+        512: Pokemon(470, 'leafeon', None, False),
+        513: Pokemon(471, 'glaceon', None, False),
+        514: Pokemon(472, 'gliscor', None, False),
+        515: Pokemon(473, 'mamoswine', None, False),
+        516: Pokemon(474, 'porygon-z', None, False),
+        517: Pokemon(475, 'gallade', None, False),
+        518: Pokemon(476, 'probopass', None, False),
+        519: Pokemon(477, 'dusknoir', None, False),
+        520: Pokemon(478, 'froslass', None, False),
+        521: Pokemon(479, 'rotom', None, False),
+        522: Pokemon(480, 'uxie', None, False),
+        523: Pokemon(481, 'mesprit', None, False),
+        524: Pokemon(482, 'azelf', None, False),
+        525: Pokemon(483, 'dialga', None, False),
+        526: Pokemon(484, 'palkia', None, False),
+        527: Pokemon(485, 'heatran', None, False),
+        528: Pokemon(486, 'regigigas', None, False),
+        529: Pokemon(487, 'giratina', 'altered', False),
+        530: Pokemon(488, 'cresselia', None, False),
+        531: Pokemon(489, 'phione', None, False),
+        532: Pokemon(490, 'manaphy', None, False),
+        533: Pokemon(491, 'darkrai', None, False),
+        534: Pokemon(492, 'shaymin', 'land', False),
+        535: Pokemon(492, 'shaymin', 'sky', False),
+        536: Pokemon(487, 'giratina', 'origin', False),
+
+        ### XXX Misc unusual forms (see also purple Kecleon and shiny Celebi above)
+        # n.b. Mama Wigglytuff is considered mono-gender like Latias
+        552: Pokemon(483, 'dialga', 'primal', False),
+        575: Pokemon(40, 'wigglytuff', 'mama', False),
+        579: Pokemon(132, 'ditto', 'sentret', False),
+        580: Pokemon(132, 'ditto', 'bellossom', False),
+
+        ### Female
+        619: Pokemon(19, 'rattata', None, True),
+        620: Pokemon(20, 'raticate', None, True),
+        641: Pokemon(41, 'zubat', None, True),
+        642: Pokemon(42, 'golbat', None, True),
+        644: Pokemon(44, 'gloom', None, True),
+        645: Pokemon(45, 'vileplume', None, True),
+        684: Pokemon(84, 'doduo', None, True),
+        685: Pokemon(85, 'dodrio', None, True),
+        697: Pokemon(97, 'hypno', None, True),
+        711: Pokemon(111, 'rhyhorn', None, True),
+        712: Pokemon(112, 'rhydon', None, True),
+        729: Pokemon(129, 'magikarp', None, True),
+        730: Pokemon(130, 'gyarados', None, True),
+        754: Pokemon(154, 'meganium', None, True),
+        765: Pokemon(165, 'ledyba', None, True),
+        766: Pokemon(166, 'ledian', None, True),
+        786: Pokemon(186, 'politoed', None, True),
+        790: Pokemon(190, 'aipom', None, True),
+        794: Pokemon(194, 'wooper', None, True),
+        798: Pokemon(198, 'murkrow', None, True),
+        829: Pokemon(202, 'wobbuffet', None, True),
+        835: Pokemon(208, 'steelix', None, True),
+        841: Pokemon(214, 'heracross', None, True),
+        842: Pokemon(215, 'sneasel', None, True),
+        848: Pokemon(221, 'piloswine', None, True),
+        859: Pokemon(232, 'donphan', None, True),
+        884: Pokemon(256, 'combusken', None, True),
+        885: Pokemon(257, 'blaziken', None, True),
+        895: Pokemon(267, 'beautifly', None, True),
+        900: Pokemon(272, 'ludicolo', None, True),
+        903: Pokemon(275, 'shiftry', None, True),
+        935: Pokemon(307, 'meditite', None, True),
+        945: Pokemon(317, 'swalot', None, True),
+        1001: Pokemon(369, 'relicanth', None, True),
+        1031: Pokemon(396, 'starly', None, True),
+        1032: Pokemon(397, 'staravia', None, True),
+        1033: Pokemon(398, 'staraptor', None, True),
+        1035: Pokemon(400, 'bibarel', None, True),
+        1036: Pokemon(401, 'kricketot', None, True),
+        1037: Pokemon(402, 'kricketune', None, True),
+        1054: Pokemon(415, 'combee', None, True),
+        1066: Pokemon(424, 'ambipom', None, True),
+        1085: Pokemon(443, 'gible', None, True),
+        1091: Pokemon(449, 'hippopotas', None, True),
+        1092: Pokemon(450, 'hippowdon', None, True),
+        1095: Pokemon(453, 'croagunk', None, True),
+        1096: Pokemon(454, 'toxicroak', None, True),
+        1098: Pokemon(456, 'finneon', None, True),
+        1099: Pokemon(457, 'lumineon', None, True),
+        1101: Pokemon(459, 'snover', None, True),
+        1102: Pokemon(460, 'abomasnow', None, True),
+        1106: Pokemon(464, 'rhyperior', None, True),
+        1115: Pokemon(473, 'mamoswine', None, True)
+    }
+
+def _build_by_identifier(sky):
+    """Build a dict of Sky Pokémon by identifier.  Default forms can also be
+    found by plain national ID, like their sprites.  Separate female sprites
+    share their identifier, so they're left out.
+    """
 
-    ### XXX Misc unusual forms (see also purple Kecleon and shiny Celebi above)
-    # n.b. Mama Wigglytuff is considered mono-gender like Latias
-    552: Pokemon(483, 'dialga', 'primal', False),
-    575: Pokemon(40, 'wigglytuff', 'mama', False),
-    579: Pokemon(132, 'ditto', 'sentret', False),
-    580: Pokemon(132, 'ditto', 'bellossom', False),
+    by_identifier = {}
+    for pokemon in sky.values():
+        if not pokemon.is_female:
+            by_identifier[pokemon.identifier] = pokemon
 
-    ### Female
-    619: Pokemon(19, 'rattata', None, True),
-    620: Pokemon(20, 'raticate', None, True),
-    641: Pokemon(41, 'zubat', None, True),
-    642: Pokemon(42, 'golbat', None, True),
-    644: Pokemon(44, 'gloom', None, True),
-    645: Pokemon(45, 'vileplume', None, True),
-    684: Pokemon(84, 'doduo', None, True),
-    685: Pokemon(85, 'dodrio', None, True),
-    697: Pokemon(97, 'hypno', None, True),
-    711: Pokemon(111, 'rhyhorn', None, True),
-    712: Pokemon(112, 'rhydon', None, True),
-    729: Pokemon(129, 'magikarp', None, True),
-    730: Pokemon(130, 'gyarados', None, True),
-    754: Pokemon(154, 'meganium', None, True),
-    765: Pokemon(165, 'ledyba', None, True),
-    766: Pokemon(166, 'ledian', None, True),
-    786: Pokemon(186, 'politoed', None, True),
-    790: Pokemon(190, 'aipom', None, True),
-    794: Pokemon(194, 'wooper', None, True),
-    798: Pokemon(198, 'murkrow', None, True),
-    829: Pokemon(202, 'wobbuffet', None, True),
-    835: Pokemon(208, 'steelix', None, True),
-    841: Pokemon(214, 'heracross', None, True),
-    842: Pokemon(215, 'sneasel', None, True),
-    848: Pokemon(221, 'piloswine', None, True),
-    859: Pokemon(232, 'donphan', None, True),
-    884: Pokemon(256, 'combusken', None, True),
-    885: Pokemon(257, 'blaziken', None, True),
-    895: Pokemon(267, 'beautifly', None, True),
-    900: Pokemon(272, 'ludicolo', None, True),
-    903: Pokemon(275, 'shiftry', None, True),
-    935: Pokemon(307, 'meditite', None, True),
-    945: Pokemon(317, 'swalot', None, True),
-    1001: Pokemon(369, 'relicanth', None, True),
-    1031: Pokemon(396, 'starly', None, True),
-    1032: Pokemon(397, 'staravia', None, True),
-    1033: Pokemon(398, 'staraptor', None, True),
-    1035: Pokemon(400, 'bibarel', None, True),
-    1036: Pokemon(401, 'kricketot', None, True),
-    1037: Pokemon(402, 'kricketune', None, True),
-    1054: Pokemon(415, 'combee', None, True),
-    1066: Pokemon(424, 'ambipom', None, True),
-    1085: Pokemon(443, 'gible', None, True),
-    1091: Pokemon(449, 'hippopotas', None, True),
-    1092: Pokemon(450, 'hippowdon', None, True),
-    1095: Pokemon(453, 'croagunk', None, True),
-    1096: Pokemon(454, 'toxicroak', None, True),
-    1098: Pokemon(456, 'finneon', None, True),
-    1099: Pokemon(457, 'lumineon', None, True),
-    1101: Pokemon(459, 'snover', None, True),
-    1102: Pokemon(460, 'abomasnow', None, True),
-    1106: Pokemon(464, 'rhyperior', None, True),
-    1115: Pokemon(473, 'mamoswine', None, True)
-}
+            if pokemon.is_default_form:
+                by_identifier[str(pokemon.national_id)] = pokemon
+
+    return by_identifier
+
+def _build_by_species(sky):
+    """Build a dict of Sky Pokémon by name: the species name for the plain or
+    default form, and e.g. deoxys-attack for the rest.
+    """
+
+    by_species = {}
+    for pokemon in sky.values():
+        if not pokemon.is_female:
+            if pokemon.form is not None:
+                name = '{0}-{1}'.format(pokemon.species, pokemon.form)
+                by_species[name] = pokemon
+
+            if pokemon.form is None or pokemon.is_default_form:
+                by_species[pokemon.species] = pokemon
+
+    return by_species
 
 def _sky_to_blue_iterator():
-    """Yield tuples for a dict of Blue Rescue Team Pokémon IDs based on the Sky
-    Pokémon ID dict.
+    """Yield tuples for a dict of Sky Pokémon IDs by Blue Rescue Team Pokémon
+    ID.
 
     This information is based on a list of Pokémon names I found in Blue's
     /system.sbin at 0x5f070.  It holds for all the sprites we need, at least.
@@ -633,14 +693,41 @@ def _sky_to_blue_iterator():
         if sky_id in skip:
             skipped += 1
         else:
-            yield (sky_id - skipped, sky[sky_id])
+            yield (sky_id - skipped, sky_id)
 
     # Final oddities; I might have the Unowns and Deoxyses in the wrong order
-    yield (415, sky[227])  # Unown !
-    yield (416, sky[228])  # Unown ?
-    yield (417, sky[419])  # Attack Deoxys
-    yield (418, sky[420])  # Defense Deoxys
-    yield (419, sky[421])  # Speed Deoxys
-    yield (420, sky[488])  # Munchlax
+    yield (415, 227)  # Unown !
+    yield (416, 228)  # Unown ?
+    yield (417, 419)  # Attack Deoxys
+    yield (418, 420)  # Defense Deoxys
+    yield (419, 421)  # Speed Deoxys
+    yield (420, 488)  # Munchlax
+
+def __getattr__(name):
+    """Build the sky and blue dicts, and the lookups into them, the first time
+    they're needed, instead of every time this module is imported.
+
+    by_identifier and by_species find Sky Pokémon by identifier or by name,
+    and by_blue_id finds the Sky Pokémon ID for a Blue Pokémon ID.  They only
+    point at the Pokémon in sky, rather than copying them.
+    """
+
+    module = sys.modules[__name__]
+
+    if name == 'sky':
+        table = _build_sky()
+    elif name == 'blue':
+        table = {blue_id: module.sky[sky_id]
+                 for blue_id, sky_id in module.by_blue_id.items()}
+    elif name == 'by_blue_id':
+        table = dict(_sky_to_blue_iterator())
+    elif name == 'by_identifier':
+        table = _build_by_identifier(module.sky)
+    elif name == 'by_species':
+        table = _build_by_species(module.sky)
+    else:
+        raise AttributeError(
+            "module {0!r} has no attribute {1!r}".format(__name__, name))
 
-blue = dict(_sky_to_blue_iterator())
+    globals()[name] = table
+    return table